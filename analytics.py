@@ -0,0 +1,102 @@
+# sentracare-be-booking/analytics.py
+# Analitik booking untuk dashboard admin dari tabel rollup booking_daily_stats.
+# Setiap write path mencatat selisih jumlah (-1 untuk kombinasi lama, +1 untuk kombinasi baru)
+# dalam transaksi yang sama, sehingga query dashboard tidak perlu scan tabel bookings.
+import os
+from collections import Counter
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import Integer, String, cast, delete, func, insert, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Booking, BookingDailyStat, JenisLayananEnum, StatusEnum
+from database import upsert_increment
+
+ANALYTICS_MAX_RANGE_DAYS = int(os.getenv("ANALYTICS_MAX_RANGE_DAYS", "366"))
+
+# Nama dimensi di parameter group_by -> kolom rollup
+DIMENSIONS = {
+    "tanggal": BookingDailyStat.tanggal_pemeriksaan,
+    "jenis_layanan": BookingDailyStat.jenis_layanan,
+    "tipe_layanan": BookingDailyStat.tipe_layanan,
+    "status": BookingDailyStat.status,
+    "doctor": BookingDailyStat.doctor_name,
+}
+KEY_COLUMNS = ["tanggal_pemeriksaan", "jenis_layanan", "tipe_layanan", "status", "doctor_name"]
+
+def _value(enum_or_none) -> str:
+    if enum_or_none is None:
+        return ""
+    return enum_or_none.value if hasattr(enum_or_none, "value") else str(enum_or_none)
+
+# Key rollup untuk satu booking, None jika booking tidak punya tanggal pemeriksaan
+def stat_key(booking: Booking) -> Optional[tuple]:
+    if booking.tanggal_pemeriksaan is None:
+        return None
+    return (
+        booking.tanggal_pemeriksaan,
+        _value(booking.jenis_layanan),
+        _value(booking.tipe_layanan),
+        _value(booking.status),
+        booking.doctor_name or "",
+    )
+
+# === Terapkan selisih jumlah ke rollup dalam satu statement upsert multi-row ===
+async def apply_stat_deltas(db: AsyncSession, deltas: Counter):
+    # Key diurutkan agar urutan lock baris sama di semua transaksi (menghindari deadlock di MySQL)
+    rows = [dict(zip(KEY_COLUMNS, key), jumlah=delta) for key, delta in sorted(deltas.items()) if delta]
+    if rows:
+        await upsert_increment(db, BookingDailyStat.__table__, rows, KEY_COLUMNS, "jumlah")
+
+# deltas: Counter milik pemanggil bulk untuk digabung lalu diterapkan sekali per chunk;
+# jika None selisih langsung diterapkan
+async def track_stats(db: AsyncSession, before: Optional[tuple], after: Optional[tuple], deltas: Counter = None):
+    pending = Counter() if deltas is None else deltas
+    if before is not None:
+        pending[before] -= 1
+    if after is not None:
+        pending[after] += 1
+    if deltas is None:
+        await apply_stat_deltas(db, pending)
+
+# === Query dashboard: jumlah booking per kombinasi dimensi dalam rentang tanggal ===
+async def booking_analytics(
+    db: AsyncSession,
+    group_by: List[str],
+    tanggal_dari: date,
+    tanggal_sampai: date,
+    jenis_layanan: Optional[JenisLayananEnum] = None,
+    status: Optional[StatusEnum] = None,
+) -> List[dict]:
+    columns = [DIMENSIONS[name].label(name) for name in group_by]
+    jumlah = func.sum(BookingDailyStat.jumlah)
+    # SUM di MySQL berupa DECIMAL, di-cast agar hasilnya int
+    stmt = select(*columns, cast(jumlah, Integer).label("jumlah")).where(
+        BookingDailyStat.tanggal_pemeriksaan >= tanggal_dari,
+        BookingDailyStat.tanggal_pemeriksaan <= tanggal_sampai,
+    )
+    if jenis_layanan is not None:
+        stmt = stmt.where(BookingDailyStat.jenis_layanan == jenis_layanan.value)
+    if status is not None:
+        stmt = stmt.where(BookingDailyStat.status == status.value)
+    if columns:
+        stmt = stmt.group_by(*columns).order_by(*columns)
+    result = []
+    for row in (await db.execute(stmt.having(jumlah > 0))).all():
+        item = row._asdict()
+        # '' di rollup berarti dimensi kosong (misal belum ada dokter)
+        result.append({key: (value if value != "" else None) for key, value in item.items()})
+    return result
+
+# === Bangun ulang rollup dari tabel bookings (rekonsiliasi jika data diubah di luar aplikasi) ===
+async def rebuild_stats(db: AsyncSession):
+    await db.execute(delete(BookingDailyStat))
+    # Kolom enum diperlakukan sebagai string agar '' tidak divalidasi sebagai nilai enum
+    dims = (
+        Booking.tanggal_pemeriksaan,
+        func.coalesce(type_coerce(Booking.jenis_layanan, String), ""),
+        func.coalesce(type_coerce(Booking.tipe_layanan, String), ""),
+        func.coalesce(type_coerce(Booking.status, String), ""),
+        func.coalesce(Booking.doctor_name, ""),
+    )
+    source = select(*dims, func.count()).where(Booking.tanggal_pemeriksaan.is_not(None)).group_by(*dims)
+    await db.execute(insert(BookingDailyStat).from_select(KEY_COLUMNS + ["jumlah"], source))
@@ -0,0 +1,73 @@
+# sentracare-be-booking/auth.py
+# Verifikasi JWT dari Auth Service dengan cache claims yang sudah terverifikasi
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+from jose import jwt, JWTError
+
+# SECRET_KEY harus sama dengan Auth Service
+SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "changeme")
+ALGORITHM = os.getenv("AUTH_ALGORITHM", "HS256")
+ISSUER = os.getenv("AUTH_ISSUER", "sentracare-auth")
+AUDIENCE = os.getenv("AUTH_AUDIENCE", "sentracare-services")
+
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))
+
+# Path yang tidak butuh user, JWT tidak perlu di-decode
+PUBLIC_PATHS = {"/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json", "/metrics"}
+
+class TokenCache:
+    # LRU + TTL, key berupa hash token sehingga token aslinya tidak disimpan di memori
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self.key(token)
+        entry = self.entries.get(key)
+        if entry is not None:
+            claims, expires_at = entry
+            if expires_at > time.time():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return claims
+            del self.entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, token: str, claims: dict):
+        expires_at = time.time() + self.ttl
+        # Entry tidak boleh hidup lebih lama dari exp token
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        key = self.key(token)
+        self.entries[key] = (claims, expires_at)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
+
+token_cache = TokenCache()
+
+def verify_token(token: str) -> Optional[dict]:
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], audience=AUDIENCE, issuer=ISSUER)
+    except JWTError:
+        return None
+    token_cache.set(token, claims)
+    return claims
@@ -0,0 +1,72 @@
+# sentracare-be-booking/benchmarks/_common.py
+# Helper bersama untuk script benchmark: setup database SQLite, seed data, dan token JWT
+import os
+import sys
+import time
+import random
+from datetime import date, time as dtime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def setup_env(db_path: str):
+    # Harus dipanggil sebelum import modul aplikasi (database.py membaca DATABASE_URL saat import)
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{db_path}")
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+def make_token(email: str, role: str = "PASIEN", ttl: int = 3600) -> str:
+    from jose import jwt
+    from auth import SECRET_KEY, ALGORITHM, ISSUER, AUDIENCE
+    claims = {
+        "sub": email,
+        "email": email,
+        "role": role,
+        "iss": ISSUER,
+        "aud": AUDIENCE,
+        "exp": int(time.time()) + ttl,
+    }
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+def booking_rows(n: int, patients: int = 1000, seed: int = 42):
+    from models import JenisKelaminEnum, JenisLayananEnum, TipeLayananEnum, StatusEnum
+    rnd = random.Random(seed)
+    start = date.today()
+    for i in range(n):
+        yield {
+            "nama_lengkap": f"Pasien {i}",
+            "tanggal_lahir": date(1960, 1, 1) + timedelta(days=rnd.randrange(20000)),
+            "jenis_kelamin": rnd.choice(list(JenisKelaminEnum)),
+            "nomor_telepon": f"08{rnd.randrange(10**9, 10**10)}",
+            "email": f"pasien{rnd.randrange(patients)}@example.com",
+            "alamat": "Jl. Contoh No. 1",
+            "jenis_layanan": rnd.choice(list(JenisLayananEnum)),
+            "tipe_layanan": rnd.choice(list(TipeLayananEnum)),
+            "tanggal_pemeriksaan": start + timedelta(days=rnd.randrange(90)),
+            "jam_pemeriksaan": dtime(rnd.randrange(8, 16)),
+            "catatan": None,
+            "status": rnd.choice(list(StatusEnum)),
+        }
+
+# Buat skema lewat migrasi Alembic, sama seperti deployment
+def migrate():
+    from alembic import command
+    from alembic.config import Config
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+def seed_bookings(n: int, patients: int = 1000, chunk: int = 10000, seed: int = 42):
+    from sqlalchemy import insert
+    from database import engine
+    from models import Booking
+    migrate()
+    rows = []
+    with engine.begin() as conn:
+        for row in booking_rows(n, patients, seed):
+            rows.append(row)
+            if len(rows) == chunk:
+                conn.execute(insert(Booking), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(Booking), rows)
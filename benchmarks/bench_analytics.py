@@ -0,0 +1,105 @@
+# sentracare-be-booking/benchmarks/bench_analytics.py
+# Query dashboard dari rollup booking_daily_stats vs GROUP BY langsung di tabel bookings.
+# Hasil kedua cara dibandingkan agar rollup terbukti sama dengan data aslinya.
+#
+#   python benchmarks/bench_analytics.py --sizes 100000,1000000
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+from _common import setup_env, seed_bookings
+
+# (nama, group_by, panjang rentang hari)
+QUERIES = [
+    ("harian_per_status_30_hari", ["tanggal", "status"], 30),
+    ("layanan_per_tipe_90_hari", ["jenis_layanan", "tipe_layanan"], 90),
+    ("per_dokter_90_hari", ["doctor"], 90),
+    ("total_per_status_90_hari", ["status"], 90),
+]
+
+def naive_query(group_by, tanggal_dari, tanggal_sampai):
+    from sqlalchemy import Integer, String, cast, func, select, type_coerce
+    from models import Booking
+    dimensions = {
+        "tanggal": Booking.tanggal_pemeriksaan,
+        "jenis_layanan": func.coalesce(type_coerce(Booking.jenis_layanan, String), ""),
+        "tipe_layanan": func.coalesce(type_coerce(Booking.tipe_layanan, String), ""),
+        "status": func.coalesce(type_coerce(Booking.status, String), ""),
+        "doctor": func.coalesce(Booking.doctor_name, ""),
+    }
+    columns = [dimensions[name].label(name) for name in group_by]
+    return (
+        select(*columns, cast(func.count(), Integer).label("jumlah"))
+        .where(Booking.tanggal_pemeriksaan >= tanggal_dari, Booking.tanggal_pemeriksaan <= tanggal_sampai)
+        .group_by(*columns)
+        .order_by(*columns)
+    )
+
+def normalize(rows) -> list:
+    return [{key: (value if value != "" else None) for key, value in row.items()} for row in rows]
+
+async def timed(fn, repeat: int):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await fn()
+        samples.append(time.perf_counter() - started)
+    return result, round(statistics.median(samples) * 1000, 3)
+
+async def run(args):
+    setup_env(os.path.join(tempfile.mkdtemp(), "analytics.db"))
+    from sqlalchemy import func, select
+    from database import AsyncSessionLocal
+    from models import BookingDailyStat
+    from analytics import booking_analytics, rebuild_stats
+
+    report = {"benchmark": "analytics", **vars(args), "sizes": [], "ok": True}
+    seeded = 0
+    for size in args.sizes:
+        # Seed langsung ke tabel bookings lalu rollup dibangun ulang, sama seperti backfill migrasi
+        seed_bookings(size - seeded, seed=size)
+        seeded = size
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await rebuild_stats(db)
+            await db.commit()
+            rebuild_seconds = round(time.perf_counter() - started, 2)
+            entry = {
+                "rows": size,
+                "rollup_rows": await db.scalar(select(func.count()).select_from(BookingDailyStat)),
+                "rebuild_seconds": rebuild_seconds,
+                "queries": {},
+            }
+            tanggal_dari = date.today()
+            for name, group_by, days in QUERIES:
+                tanggal_sampai = tanggal_dari + timedelta(days=days - 1)
+                rollup, rollup_ms = await timed(
+                    lambda: booking_analytics(db, group_by, tanggal_dari, tanggal_sampai), args.repeat
+                )
+                stmt = naive_query(group_by, tanggal_dari, tanggal_sampai)
+                naive, naive_ms = await timed(
+                    lambda: db.execute(stmt), args.repeat
+                )
+                same = normalize(row._asdict() for row in naive.all()) == rollup
+                report["ok"] &= same
+                entry["queries"][name] = {
+                    "groups": len(rollup),
+                    "rollup_ms": rollup_ms,
+                    "naive_ms": naive_ms,
+                    "speedup": round(naive_ms / rollup_ms, 1) if rollup_ms else None,
+                    "same_result": same,
+                }
+        report["sizes"].append(entry)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,77 @@
+# sentracare-be-booking/benchmarks/bench_async_db.py
+# Membandingkan throughput request konkuren: Session sync di handler async (cara lama)
+# vs AsyncSession dari get_db. Query lambat disimulasikan dengan fungsi SQL sleep_ms().
+#
+#   python benchmarks/bench_async_db.py --requests 200 --concurrency 20 --query-ms 20
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from _common import setup_env, make_token, seed_bookings
+
+def register_sleep(dbapi_connection, _record):
+    dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000))
+
+async def run(args):
+    setup_env(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    from fastapi import Depends, Request
+    from sqlalchemy import event, select, text
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from database import engine, async_engine, SessionLocal
+    from models import Booking
+    from crud import scope_bookings
+    import httpx
+    import main
+
+    event.listen(engine, "connect", register_sleep)
+    event.listen(async_engine.sync_engine, "connect", register_sleep)
+    engine.dispose()
+    seed_bookings(args.rows)
+
+    slow = text("SELECT sleep_ms(:ms)")
+
+    @main.app.get("/bench/sync")
+    async def bench_sync(request: Request):
+        db = SessionLocal()
+        try:
+            db.execute(slow, {"ms": args.query_ms})
+            stmt = scope_bookings(select(Booking), request.state.user).limit(20)
+            return len(db.execute(stmt).scalars().all())
+        finally:
+            db.close()
+
+    @main.app.get("/bench/async")
+    async def bench_async(request: Request, db: AsyncSession = Depends(main.get_db)):
+        await db.execute(slow, {"ms": args.query_ms})
+        stmt = scope_bookings(select(Booking), request.state.user).limit(20)
+        return len((await db.execute(stmt)).scalars().all())
+
+    headers = {"Authorization": f"Bearer {make_token('pasien1@example.com')}"}
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for mode in ("sync", "async"):
+            sem = asyncio.Semaphore(args.concurrency)
+
+            async def one():
+                async with sem:
+                    r = await client.get(f"/bench/{mode}", headers=headers)
+                    r.raise_for_status()
+
+            await one()  # warm up pool
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.requests)))
+            elapsed = time.perf_counter() - started
+            results[mode] = {"seconds": round(elapsed, 3), "req_per_s": round(args.requests / elapsed, 1)}
+    print(json.dumps({"benchmark": "async_db", **vars(args), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--query-ms", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
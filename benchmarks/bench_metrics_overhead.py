@@ -0,0 +1,131 @@
+# sentracare-be-booking/benchmarks/bench_metrics_overhead.py
+# Mengukur overhead instrumentasi metrik (middleware + hook SQLAlchemy + extension GraphQL).
+# Setiap mode dijalankan di proses terpisah karena METRICS_ENABLED dibaca saat import, bergantian
+# selama beberapa ronde dan diambil median karena throughput end-to-end cukup berisik.
+# Biaya hook per request / per query juga diukur langsung (microbenchmark) sebagai angka yang stabil.
+# Cache list dimatikan agar setiap request benar-benar menjalankan query.
+#
+#   python benchmarks/bench_metrics_overhead.py --requests 2000 --concurrency 20 --rounds 3
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+from _common import setup_env, make_token, seed_bookings
+
+WORKLOADS = {
+    "full_list": ("GET", "/api/bookings/full?limit=20", None),
+    "graphql": ("POST", "/booking/graphql", {"query": "query Daftar { bookings(first: 20) { id namaLengkap status } }"}),
+}
+
+async def run_child(args):
+    setup_env(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ["OUTBOX_DISPATCHER_ENABLED"] = "false"
+    seed_bookings(args.rows)
+    import httpx
+    import main
+
+    headers = {"Authorization": f"Bearer {make_token('pasien1@example.com')}"}
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, (method, url, body) in WORKLOADS.items():
+            sem = asyncio.Semaphore(args.concurrency)
+            latencies = []
+
+            async def one():
+                async with sem:
+                    started = time.perf_counter()
+                    r = await client.request(method, url, json=body, headers=headers)
+                    r.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+
+            await asyncio.gather(*(one() for _ in range(50)))  # warm up
+            latencies.clear()
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.requests)))
+            elapsed = time.perf_counter() - started
+            quantiles = statistics.quantiles(latencies, n=100)
+            results[name] = {
+                "req_per_s": round(args.requests / elapsed, 1),
+                "p50_ms": round(quantiles[49] * 1000, 3),
+                "p99_ms": round(quantiles[98] * 1000, 3),
+            }
+    print(json.dumps(results))
+
+def run_mode(enabled: bool, args) -> dict:
+    env = dict(os.environ, METRICS_ENABLED="true" if enabled else "false", LOG_LEVEL="WARNING")
+    cmd = [sys.executable, os.path.abspath(__file__), "--child",
+           "--rows", str(args.rows), "--requests", str(args.requests), "--concurrency", str(args.concurrency)]
+    output = subprocess.run(cmd, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def median_results(runs: list) -> dict:
+    return {
+        name: {key: statistics.median(run[name][key] for run in runs) for key in runs[0][name]}
+        for name in WORKLOADS
+    }
+
+# === Biaya langsung hook metrik dalam mikrodetik ===
+def hook_cost(number: int = 20000) -> dict:
+    setup_env(os.path.join(tempfile.mkdtemp(), "hooks.db"))
+    import metrics
+
+    class FakeConnection:
+        info = {}
+
+    conn = FakeConnection()
+    stats = metrics.RequestStats()
+
+    def query():
+        metrics._before_cursor_execute(conn, None, "SELECT 1", None, None, False)
+        metrics._after_cursor_execute(conn, None, "SELECT 1", None, None, False)
+
+    def request():
+        metrics.observe_request("GET", "/api/bookings/full", 200, 0.01, stats)
+
+    return {
+        "per_query_us": round(timeit.timeit(query, number=number) / number * 1e6, 2),
+        "per_request_us": round(timeit.timeit(request, number=number) / number * 1e6, 2),
+    }
+
+def main(args):
+    runs = {"metrics_off": [], "metrics_on": []}
+    for _ in range(args.rounds):
+        runs["metrics_off"].append(run_mode(False, args))
+        runs["metrics_on"].append(run_mode(True, args))
+    results = {mode: median_results(mode_runs) for mode, mode_runs in runs.items()}
+    overhead = {}
+    for name in WORKLOADS:
+        off, on = results["metrics_off"][name], results["metrics_on"][name]
+        overhead[name] = {
+            "throughput_pct": round((off["req_per_s"] - on["req_per_s"]) / off["req_per_s"] * 100, 2),
+            "p50_delta_ms": round(on["p50_ms"] - off["p50_ms"], 3),
+        }
+    print(json.dumps({
+        "benchmark": "metrics_overhead",
+        **vars(args),
+        "results": results,
+        "overhead": overhead,
+        "hooks": hook_cost(),
+    }, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--child", action="store_true")
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(run_child(args))
+    else:
+        main(args)
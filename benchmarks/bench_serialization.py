@@ -0,0 +1,89 @@
+# sentracare-be-booking/benchmarks/bench_serialization.py
+# CPU time dan peak memory per request untuk serialisasi list booking:
+# jalur lama (ORM -> dict -> BookingResponse -> validasi response_model -> JSON)
+# vs jalur baru (select kolom -> orjson).
+#
+#   python benchmarks/bench_serialization.py --sizes 10000,100000
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from _common import setup_env, seed_bookings
+
+def measure(fn, repeat: int) -> dict:
+    cpu = []
+    for _ in range(repeat):
+        started = time.process_time()
+        fn()
+        cpu.append(time.process_time() - started)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"cpu_ms": round(min(cpu) * 1000, 1), "peak_mb": round(peak / 2**20, 1)}
+
+def run(args):
+    setup_env(os.path.join(tempfile.mkdtemp(), "serialization.db"))
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from database import SessionLocal
+    from models import Booking
+    from main import BookingResponse
+    from serialization import BOOKING_COLUMNS, encode_bookings
+
+    adapter = TypeAdapter(List[BookingResponse])
+
+    def legacy_dict(booking):
+        return {
+            "id": booking.id,
+            "nama_lengkap": booking.nama_lengkap,
+            "tanggal_lahir": booking.tanggal_lahir,
+            "jenis_kelamin": booking.jenis_kelamin.value if booking.jenis_kelamin else None,
+            "nomor_telepon": booking.nomor_telepon,
+            "email": booking.email,
+            "alamat": booking.alamat,
+            "jenis_layanan": booking.jenis_layanan.value if booking.jenis_layanan else None,
+            "tipe_layanan": booking.tipe_layanan.value if booking.tipe_layanan else None,
+            "tanggal_pemeriksaan": booking.tanggal_pemeriksaan,
+            "jam_pemeriksaan": str(booking.jam_pemeriksaan) if booking.jam_pemeriksaan else None,
+            "catatan": booking.catatan,
+            "status": booking.status.value if booking.status else "PENDING",
+            "doctor_name": booking.doctor_name,
+            "created_at": str(booking.created_at) if booking.created_at else None,
+            "updated_at": str(booking.updated_at) if booking.updated_at else None,
+        }
+
+    report = {"benchmark": "serialization", "sizes": []}
+    seeded = 0
+    for size in args.sizes:
+        seed_bookings(size - seeded, seed=size)
+        seeded = size
+
+        def legacy():
+            with SessionLocal() as db:
+                bookings = db.execute(select(Booking).order_by(Booking.id.desc())).scalars().all()
+                result = [BookingResponse(**legacy_dict(b)) for b in bookings]
+                # Sama seperti response_model=List[BookingResponse]: validasi ulang lalu serialisasi
+                return adapter.dump_json(adapter.validate_python(result))
+
+        def fast():
+            with SessionLocal() as db:
+                rows = db.execute(select(*BOOKING_COLUMNS).order_by(Booking.id.desc())).all()
+                return encode_bookings(rows)
+
+        report["sizes"].append({
+            "rows": size,
+            "legacy": measure(legacy, args.repeat),
+            "orjson_columns": measure(fast, args.repeat),
+        })
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    run(parser.parse_args())
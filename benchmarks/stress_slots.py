@@ -0,0 +1,189 @@
+# sentracare-be-booking/benchmarks/stress_slots.py
+# Stress test reservasi slot: beberapa proses worker mengirim create-booking paralel ke slot yang sama,
+# lalu dicek bahwa jumlah booking tidak melebihi kapasitas dan counter slot konsisten.
+# Sebagian request memakai jam di luar grid slot (misal 09:00:01) yang harus ditolak 422, bukan
+# mendapat counter slot sendiri. Setelah itu booking yang berhasil dibuat dibatalkan dan dikonfirmasi
+# ulang secara paralel dari semua worker: counter slot harus tetap sama dengan jumlah booking aktif,
+# setiap transisi hanya tercatat sekali (tidak ada CANCELLED / CONFIRMED dua kali berturut-turut di
+# change feed dan outbox) dan rollup per status sama dengan isi tabel booking.
+# Exit code 1 jika terjadi overbooking atau salah satu pemeriksaan gagal.
+#
+#   python benchmarks/stress_slots.py --workers 4 --requests 100 --capacity 25
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from collections import Counter, defaultdict
+from datetime import date, time, timedelta
+
+from _common import setup_env, migrate, make_token
+
+TANGGAL = date.today() + timedelta(days=7)
+JAM = time(9)
+# Jam yang digeser sedikit dari slot 09:00; tanpa validasi grid masing-masing mendapat kapasitas penuh
+OFF_GRID = [time(9, 0, 1), time(9, 30), time(9, 0, 0, 1)]
+
+def booking_body(i: int, jam: time = JAM) -> dict:
+    return {
+        "nama_lengkap": f"Stress {i}",
+        "tanggal_lahir": "1990-01-01",
+        "jenis_kelamin": "LAKI_LAKI",
+        "nomor_telepon": "081234567890",
+        "alamat": "Jl. Contoh No. 1",
+        "jenis_layanan": "MEDICAL_CHECKUP",
+        "tipe_layanan": "FULL_BODY",
+        "tanggal_pemeriksaan": str(TANGGAL),
+        "jam_pemeriksaan": str(jam),
+    }
+
+async def fire(worker: int, requests: int, concurrency: int, off_grid_every: int) -> dict:
+    import httpx
+    import main
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+        async def one(i):
+            headers = {"Authorization": f"Bearer {make_token(f'stress{worker}-{i}@example.com')}"}
+            off_grid = off_grid_every and i % off_grid_every == 0
+            jam = OFF_GRID[i % len(OFF_GRID)] if off_grid else JAM
+            async with sem:
+                r = await client.post("/booking/create-booking", json=booking_body(i, jam), headers=headers)
+                return ("off_grid" if off_grid else "on_grid"), r.status_code
+        results = await asyncio.gather(*(one(i) for i in range(requests)))
+    codes = {"on_grid": Counter(), "off_grid": Counter()}
+    for kind, code in results:
+        codes[kind][code] += 1
+    return codes
+
+def worker_main(args):
+    db_path, worker, requests, concurrency, off_grid_every = args
+    setup_env(db_path)
+    os.environ["OUTBOX_DISPATCHER_ENABLED"] = "false"
+    return asyncio.run(fire(worker, requests, concurrency, off_grid_every))
+
+# Setiap worker mengirim cancel dan konfirmasi ulang bergantian untuk semua booking, paralel dengan worker lain
+async def flip(worker: int, booking_ids: list, rounds: int, concurrency: int) -> Counter:
+    import httpx
+    import main
+    sem = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {make_token('admin@example.com', role='SUPERADMIN')}"}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://stress") as client:
+        async def one(booking_id, i):
+            status = "CANCELLED" if (worker + i) % 2 == 0 else "CONFIRMED"
+            body = {"status": status, "doctor_name": "dr. Stress", "doctor_email": "dokter@example.com"}
+            async with sem:
+                r = await client.put(f"/booking/{booking_id}/status", json=body, headers=headers)
+                return r.status_code
+        codes = await asyncio.gather(*(one(booking_id, i) for booking_id in booking_ids for i in range(rounds)))
+    return Counter(codes)
+
+def flip_main(args):
+    db_path, worker, booking_ids, rounds, concurrency = args
+    setup_env(db_path)
+    os.environ["OUTBOX_DISPATCHER_ENABLED"] = "false"
+    return asyncio.run(flip(worker, booking_ids, rounds, concurrency))
+
+# Urutan op change feed per booking setelah CREATED tidak boleh berisi transisi yang sama dua kali berturut-turut
+def repeated_transitions(ops: list) -> bool:
+    return any(a == b for a, b in zip(ops[1:], ops[2:]))
+
+def run(args):
+    db_path = os.path.join(tempfile.mkdtemp(), "stress.db")
+    setup_env(db_path)
+    migrate()
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import Session
+    from database import engine
+    from models import Booking, BookingChange, BookingDailyStat, BookingOutbox, SlotCapacity, SlotCounter, JenisLayananEnum, StatusEnum
+    with Session(engine) as db:
+        db.add(SlotCapacity(jenis_layanan=JenisLayananEnum.MEDICAL_CHECKUP, jam_pemeriksaan=None, capacity=args.capacity))
+        db.commit()
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(args.workers) as pool:
+        results = pool.map(worker_main, [(db_path, w, args.requests, args.concurrency, args.off_grid_every) for w in range(args.workers)])
+
+    codes, off_grid_codes = Counter(), Counter()
+    for result in results:
+        codes.update(result["on_grid"])
+        off_grid_codes.update(result["off_grid"])
+
+    with Session(engine) as db:
+        booking_ids = db.scalars(select(Booking.id).where(Booking.tanggal_pemeriksaan == TANGGAL).order_by(Booking.id)).all()
+    with ctx.Pool(args.workers) as pool:
+        flips = pool.map(flip_main, [(db_path, w, booking_ids, args.flip_rounds, args.concurrency) for w in range(args.workers)])
+    flip_codes = sum(flips, Counter())
+    with Session(engine) as db:
+        # Semua booking di tanggal tersebut, termasuk yang (seharusnya tidak) lolos dengan jam di luar grid
+        booked = db.scalar(
+            select(func.count()).select_from(Booking).where(
+                Booking.tanggal_pemeriksaan == TANGGAL,
+                Booking.status != StatusEnum.CANCELLED,
+            )
+        )
+        counters = db.execute(
+            select(SlotCounter.jam_pemeriksaan, SlotCounter.reserved).where(SlotCounter.tanggal_pemeriksaan == TANGGAL)
+        ).all()
+        ops = defaultdict(list)
+        for booking_id, op in db.execute(
+            select(BookingChange.booking_id, BookingChange.op).where(BookingChange.booking_id.in_(booking_ids)).order_by(BookingChange.id)
+        ):
+            ops[booking_id].append(op.value)
+        events = defaultdict(list)
+        for booking_id, event_type in db.execute(
+            select(BookingOutbox.booking_id, BookingOutbox.event_type).where(BookingOutbox.booking_id.in_(booking_ids)).order_by(BookingOutbox.id)
+        ):
+            events[booking_id].append(event_type)
+        per_status = dict(db.execute(
+            select(Booking.status, func.count()).where(Booking.tanggal_pemeriksaan == TANGGAL).group_by(Booking.status)
+        ).all())
+        rollup = dict(db.execute(
+            select(BookingDailyStat.status, func.sum(BookingDailyStat.jumlah))
+            .where(BookingDailyStat.tanggal_pemeriksaan == TANGGAL)
+            .group_by(BookingDailyStat.status)
+        ).all())
+    reserved = sum(row.reserved for row in counters)
+    per_status = {status.value: count for status, count in per_status.items()}
+    rollup = {status: count for status, count in rollup.items() if count}
+    repeated = sorted(booking_id for booking_id in booking_ids if repeated_transitions(ops[booking_id]) or repeated_transitions(events[booking_id]))
+
+    ok = (
+        booked <= args.capacity
+        and booked == reserved
+        and codes.get(200, 0) == len(booking_ids) <= args.capacity
+        and all(row.jam_pemeriksaan == JAM for row in counters)
+        and set(off_grid_codes) <= {422}
+        and set(flip_codes) <= {200, 409}
+        and not repeated
+        and per_status == rollup
+    )
+    print(json.dumps({
+        "benchmark": "stress_slots",
+        **vars(args),
+        "status_codes": {str(k): v for k, v in sorted(codes.items())},
+        "off_grid_status_codes": {str(k): v for k, v in sorted(off_grid_codes.items())},
+        "created": len(booking_ids),
+        "booked": booked,
+        "counter_reserved": reserved,
+        "slot_counters": len(counters),
+        "flip_status_codes": {str(k): v for k, v in sorted(flip_codes.items())},
+        "status_counts": per_status,
+        "rollup_counts": rollup,
+        "repeated_transitions": repeated,
+        "ok": ok,
+    }, indent=2))
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=100, help="request per worker")
+    parser.add_argument("--concurrency", type=int, default=20, help="request paralel per worker")
+    parser.add_argument("--capacity", type=int, default=25)
+    parser.add_argument("--flip-rounds", type=int, default=10, help="cancel / konfirmasi ulang per booking per worker")
+    parser.add_argument("--off-grid-every", type=int, default=4, help="setiap request ke-N memakai jam di luar grid, 0 = nonaktif")
+    sys.exit(run(parser.parse_args()))
@@ -0,0 +1,30 @@
+# sentracare-be-booking/benchmarks/stub_patient_service.py
+# Stub patient-service untuk pengujian lokal outbox dispatcher.
+#
+#   STUB_FAIL_RATE=0.2 STUB_LATENCY_MS=50 uvicorn stub_patient_service:app --port 8001
+#   PATIENT_SERVICE_URL=http://localhost:8001 uvicorn main:app
+import asyncio
+import os
+import random
+from fastapi import FastAPI, Request, HTTPException
+
+FAIL_RATE = float(os.getenv("STUB_FAIL_RATE", "0"))
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+
+app = FastAPI(title="Stub Patient Service")
+app.state.received = {}
+
+@app.post("/patients/internal-register")
+async def internal_register(request: Request):
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if random.random() < FAIL_RATE:
+        raise HTTPException(status_code=503, detail="Stub failure")
+    key = request.headers.get("Idempotency-Key")
+    duplicate = key in app.state.received
+    app.state.received[key] = await request.json()
+    return {"duplicate": duplicate}
+
+@app.get("/stats")
+async def stats():
+    return {"received": len(app.state.received)}
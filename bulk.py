@@ -0,0 +1,187 @@
+# sentracare-be-booking/bulk.py
+# Bulk import booking dan bulk update status: baris divalidasi sekaligus lalu ditulis per chunk,
+# satu transaksi per chunk, bukan satu commit per booking.
+import csv
+import json
+import os
+from collections import Counter, defaultdict
+from typing import AsyncIterator, List, Tuple
+from fastapi import Request
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Booking, ChangeOpEnum
+from schemas import BulkBookingRow, BulkStatusRow
+from crud import booking_values, apply_status_change, StatusBatch
+from outbox import enqueue_events, booking_event_payload, BOOKING_CREATED
+from slots import reserve_slot, SlotPenuhError
+from cache import booking_cache
+from changes import record_changes
+from analytics import stat_key, apply_stat_deltas
+from database import insert_many
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "50000"))
+
+class BulkFormatError(Exception):
+    pass
+
+async def iter_lines(request: Request) -> AsyncIterator[str]:
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+# === Baca baris dari body: JSON array, NDJSON, atau CSV (dengan header). NDJSON/CSV dibaca streaming ===
+async def iter_raw_rows(request: Request) -> AsyncIterator[object]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "application/json":
+        try:
+            body = await request.json()
+        except ValueError:
+            raise BulkFormatError("Body bukan JSON yang valid")
+        if not isinstance(body, list):
+            raise BulkFormatError("Body JSON harus berupa array")
+        for row in body:
+            yield row
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        async for line in iter_lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield e
+    elif content_type == "text/csv":
+        # Catatan: nilai CSV tidak boleh mengandung baris baru karena dibaca per baris
+        header = None
+        async for line in iter_lines(request):
+            if not line.strip():
+                continue
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            yield {key: (value if value != "" else None) for key, value in zip(header, values)}
+    else:
+        raise BulkFormatError("Content-Type harus application/json, application/x-ndjson atau text/csv")
+
+# === Validasi baris dan kelompokkan per chunk. Hasil: (chunk baris valid, hasil baris tidak valid) ===
+async def iter_chunks(request: Request, model) -> AsyncIterator[Tuple[list, list]]:
+    valid, invalid = [], []
+    index = 0
+    async for raw in iter_raw_rows(request):
+        if index >= BULK_MAX_ROWS:
+            # Chunk sebelumnya sudah di-commit, jadi batas dilaporkan sebagai hasil baris (bukan 400) agar
+            # client tahu baris mana yang sudah dibuat; sisa body tidak dibaca
+            invalid.append({"row": index, "status": "error", "error": f"Maksimal {BULK_MAX_ROWS} baris per request, baris ini dan seterusnya tidak diproses"})
+            break
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            valid.append((index, model.model_validate(raw)))
+        except (ValidationError, ValueError, TypeError) as e:
+            invalid.append(row_error(index, e))
+        index += 1
+        if len(valid) >= BULK_CHUNK_SIZE:
+            yield valid, invalid
+            valid, invalid = [], []
+    if valid or invalid:
+        yield valid, invalid
+
+def row_error(index: int, error) -> dict:
+    if isinstance(error, ValidationError):
+        detail = [{"field": ".".join(str(p) for p in e["loc"]), "message": e["msg"]} for e in error.errors()]
+    else:
+        detail = str(error)
+    return {"row": index, "status": "error", "error": detail}
+
+# === Bulk create: reservasi slot per grup slot, insert multi-row, satu commit per chunk ===
+async def create_bookings_chunk(db: AsyncSession, rows: List[tuple], default_email: str) -> List[dict]:
+    results = []
+    groups = defaultdict(list)
+    for index, row in rows:
+        groups[(row.jenis_layanan, row.tanggal_pemeriksaan, row.jam_pemeriksaan)].append((index, row))
+
+    accepted = []
+    for (jenis_layanan, tanggal, jam), members in groups.items():
+        if await reserve_slot(db, jenis_layanan, tanggal, jam, count=len(members)):
+            accepted += members
+            continue
+        # Kapasitas tidak cukup untuk seluruh grup, isi sisa slot satu per satu
+        for position, (index, row) in enumerate(members):
+            if not await reserve_slot(db, jenis_layanan, tanggal, jam):
+                for index, _ in members[position:]:
+                    results.append({"row": index, "status": "error", "error": "Slot pemeriksaan sudah penuh"})
+                break
+            accepted.append((index, row))
+
+    # INSERT multi-row lewat Core, bukan flush ORM yang di MySQL (tanpa RETURNING) mengirim satu INSERT per baris
+    values = [booking_values(row, row.email or default_email) for _, row in accepted]
+    ids = await insert_many(db, Booking.__table__, values)
+    bookings = [Booking(id=booking_id, **row) for booking_id, row in zip(ids, values)]
+    change_ids = await record_changes(db, [(booking, ChangeOpEnum.CREATED) for booking in bookings])
+    await enqueue_events(db, [
+        (booking.id, BOOKING_CREATED, booking_event_payload(booking), change_id)
+        for booking, change_id in zip(bookings, change_ids)
+    ])
+    await apply_stat_deltas(db, Counter(stat_key(booking) for booking in bookings))
+    await db.commit()
+    await booking_cache.invalidate({booking.email for booking in bookings})
+
+    results += [{"row": index, "status": "created", "booking_id": booking.id} for (index, _), booking in zip(accepted, bookings)]
+    return results
+
+# === Bulk status: booking dimuat dan di-lock dengan satu query IN, perubahan ditulis set-based per chunk (StatusBatch) ===
+# Jika booking berubah bersamaan (StatusConflictError), seluruh chunk di-rollback dan dilaporkan error oleh run_bulk
+async def update_status_chunk(db: AsyncSession, rows: List[tuple]) -> List[dict]:
+    ids = sorted({row.booking_id for _, row in rows})
+    stmt = select(Booking).where(Booking.id.in_(ids)).order_by(Booking.id).with_for_update()
+    bookings = {b.id: b for b in (await db.execute(stmt)).scalars().all()}
+    batch = StatusBatch()
+
+    results = []
+    changed_emails = set()
+    for index, row in rows:
+        booking = bookings.get(row.booking_id)
+        status_input = row.status.upper()
+        if not booking:
+            results.append({"row": index, "status": "error", "booking_id": row.booking_id, "error": "Booking tidak ditemukan"})
+        elif status_input not in ("CONFIRMED", "CANCELLED"):
+            results.append({"row": index, "status": "error", "booking_id": row.booking_id, "error": "Status harus CONFIRMED atau CANCELLED"})
+        else:
+            try:
+                await apply_status_change(db, booking, status_input, row.doctor_name, row.doctor_email, batch)
+                results.append({"row": index, "status": "updated", "booking_id": booking.id})
+                changed_emails.add(booking.email)
+            except SlotPenuhError as e:
+                results.append({"row": index, "status": "error", "booking_id": booking.id, "error": str(e)})
+    await batch.apply(db)
+    await db.commit()
+    await booking_cache.invalidate(changed_emails)
+    return results
+
+async def run_bulk(request: Request, db: AsyncSession, model, process) -> dict:
+    results = []
+    async for valid, invalid in iter_chunks(request, model):
+        results += invalid
+        if not valid:
+            continue
+        try:
+            results += await process(db, valid)
+        except Exception as e:
+            await db.rollback()
+            results += [{"row": index, "status": "error", "error": str(e)} for index, _ in valid]
+    results.sort(key=lambda r: r["row"])
+    failed = sum(1 for r in results if r["status"] == "error")
+    return {"total": len(results), "success": len(results) - failed, "failed": failed, "results": results}
+
+async def bulk_create(request: Request, db: AsyncSession, default_email: str) -> dict:
+    return await run_bulk(request, db, BulkBookingRow, lambda db, rows: create_bookings_chunk(db, rows, default_email))
+
+async def bulk_update_status(request: Request, db: AsyncSession) -> dict:
+    return await run_bulk(request, db, BulkStatusRow, update_status_chunk)
@@ -0,0 +1,183 @@
+# sentracare-be-booking/cache.py
+# Read-through cache untuk list booking per scope (email pasien / SUPERADMIN).
+# Invalidasi memakai nomor generasi per scope: write path menaikkan generasi sehingga
+# entry lama tidak pernah terbaca lagi, tanpa perlu mencari dan menghapus key satu per satu.
+import hashlib
+import itertools
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+import orjson
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# Sebagian kecil hit diverifikasi ulang ke database untuk mengukur stale read
+CACHE_VERIFY_RATE = float(os.getenv("CACHE_VERIFY_RATE", "0.01"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+ALL_SCOPE = "all"
+
+class CacheEntry:
+    def __init__(self, body: bytes, meta: dict = None, etag: str = None):
+        self.body = body
+        self.meta = meta or {}
+        self.etag = etag or make_etag(body)
+
+    def dump(self) -> bytes:
+        return orjson.dumps({"etag": self.etag, "meta": self.meta}) + b"\n" + self.body
+
+    @classmethod
+    def load(cls, raw: bytes) -> "CacheEntry":
+        header, body = raw.split(b"\n", 1)
+        header = orjson.loads(header)
+        return cls(body, header["meta"], header["etag"])
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+class InMemoryBackend:
+    def __init__(self, maxsize: int = CACHE_MAX_ENTRIES):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.generations = OrderedDict()
+        self.counter = itertools.count(1)
+        # Generasi default untuk scope yang tidak tercatat; naik setiap ada generasi yang di-evict
+        self.floor = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    async def generation(self, scope: str) -> int:
+        return self.generations.get(scope, self.floor)
+
+    async def bump(self, scopes: Iterable[str]):
+        for scope in scopes:
+            self.generations[scope] = next(self.counter)
+            self.generations.move_to_end(scope)
+        while len(self.generations) > self.maxsize:
+            _, evicted = self.generations.popitem(last=False)
+            self.floor = max(self.floor, evicted)
+
+class RedisBackend:
+    def __init__(self, client=None, url: str = REDIS_URL, ttl: int = CACHE_TTL):
+        if client is None:
+            import redis.asyncio as redis
+            client = redis.from_url(url)
+        self.client = client
+        # Key generasi harus hidup lebih lama dari entry, jika tidak generasi bisa kembali ke angka lama
+        self.generation_ttl = ttl * 10
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.client.set(key, value, ex=ttl)
+
+    async def generation(self, scope: str) -> int:
+        key = f"bookings:gen:{scope}"
+        async with self.client.pipeline(transaction=False) as pipe:
+            value, _ = await pipe.get(key).expire(key, self.generation_ttl).execute()
+        return int(value or 0)
+
+    async def bump(self, scopes: Iterable[str]):
+        async with self.client.pipeline(transaction=False) as pipe:
+            for scope in scopes:
+                key = f"bookings:gen:{scope}"
+                pipe.incr(key).expire(key, self.generation_ttl)
+            await pipe.execute()
+
+class BookingListCache:
+    def __init__(self, backend, ttl: int = CACHE_TTL, enabled: bool = CACHE_ENABLED, verify_rate: float = CACHE_VERIFY_RATE):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.verify_rate = verify_rate
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.verified = 0
+        self.stale_reads = 0
+
+    @staticmethod
+    def scope(user: dict) -> str:
+        if str(user.get("role", "")).upper() == "SUPERADMIN":
+            return ALL_SCOPE
+        return f"email:{user.get('email')}"
+
+    async def _key(self, user: dict, variant: str) -> str:
+        scope = self.scope(user)
+        generation = await self.backend.generation(scope)
+        return f"bookings:{scope}:{generation}:{variant}"
+
+    # === Ambil dari cache, jika tidak ada panggil loader() lalu simpan hasilnya ===
+    async def get_or_load(self, user: dict, variant: str, loader) -> CacheEntry:
+        if not self.enabled:
+            return await loader()
+        key = await self._key(user, variant)
+        raw = await self.backend.get(key)
+        if raw is not None:
+            self.hits += 1
+            entry = CacheEntry.load(raw)
+            if self.verify_rate and random.random() < self.verify_rate:
+                self.verified += 1
+                fresh = await loader()
+                if fresh.etag != entry.etag:
+                    self.stale_reads += 1
+                    await self.backend.set(key, fresh.dump(), self.ttl)
+                    return fresh
+            return entry
+        self.misses += 1
+        entry = await loader()
+        await self.backend.set(key, entry.dump(), self.ttl)
+        return entry
+
+    # Dipanggil setelah commit pada write path untuk email pasien yang bookingnya berubah
+    async def invalidate(self, emails: Iterable[str]):
+        if not self.enabled:
+            return
+        scopes = {f"email:{email}" for email in emails} | {ALL_SCOPE}
+        self.invalidations += 1
+        await self.backend.bump(scopes)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.__class__.__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "verified": self.verified,
+            "stale_reads": self.stale_reads,
+        }
+
+def make_backend():
+    if CACHE_BACKEND == "redis":
+        return RedisBackend()
+    return InMemoryBackend()
+
+booking_cache = BookingListCache(make_backend())
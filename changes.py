@@ -0,0 +1,88 @@
+# sentracare-be-booking/changes.py
+# Change feed booking untuk sinkronisasi inkremental (EMR / patient-service): setiap write path
+# menulis baris booking_changes dalam transaksi yang sama, pembaca cukup meminta perubahan
+# dengan id > cursor terakhirnya. Booking yang dibatalkan dikirim sebagai tombstone.
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import Booking, BookingChange, ChangeOpEnum, StatusEnum
+from serialization import BOOKING_COLUMNS, BOOKING_FIELDS
+from database import insert_many
+
+CHANGE_FEED_PAGE_SIZE = int(os.getenv("CHANGE_FEED_PAGE_SIZE", "500"))
+CHANGE_FEED_MAX_PAGE_SIZE = int(os.getenv("CHANGE_FEED_MAX_PAGE_SIZE", "5000"))
+# Perubahan yang lebih muda dari ini belum dikirim: id auto increment dibagikan saat insert, bukan saat
+# commit, sehingga transaksi yang lebih lambat bisa meng-commit id lebih kecil setelah cursor melewatinya.
+# Harus lebih lama dari transaksi write terlama; 0 aman untuk SQLite (satu writer).
+CHANGE_FEED_SETTLE_SECONDS = float(os.getenv("CHANGE_FEED_SETTLE_SECONDS", "2"))
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "1"))
+# Satu koneksi SSE ditutup setelah durasi ini, client menyambung lagi dengan Last-Event-ID
+CHANGE_FEED_STREAM_TIMEOUT = float(os.getenv("CHANGE_FEED_STREAM_TIMEOUT", "30"))
+CHANGE_FEED_HEARTBEAT = float(os.getenv("CHANGE_FEED_HEARTBEAT", "15"))
+
+# === Catat perubahan dengan satu INSERT multi-row, commit dilakukan oleh pemanggil bersama perubahan booking ===
+# changes: (booking, op). Id baris dikembalikan sesuai urutan, dipakai sebagai key event outbox transisi yang sama.
+async def record_changes(db: AsyncSession, changes: Iterable[tuple]) -> List[int]:
+    now = datetime.utcnow()
+    rows = [{"booking_id": booking.id, "email": booking.email, "op": op, "changed_at": now} for booking, op in changes]
+    return await insert_many(db, BookingChange.__table__, rows)
+
+# email None berarti semua pasien (SUPERADMIN)
+def changes_query(email: Optional[str], since: int, limit: int):
+    stmt = select(BookingChange.id, BookingChange.booking_id).where(BookingChange.id > since)
+    if email is not None:
+        stmt = stmt.where(BookingChange.email == email)
+    if CHANGE_FEED_SETTLE_SECONDS:
+        stmt = stmt.where(BookingChange.changed_at <= datetime.utcnow() - timedelta(seconds=CHANGE_FEED_SETTLE_SECONDS))
+    return stmt.order_by(BookingChange.id).limit(limit)
+
+# === Satu halaman delta: state terbaru setiap booking yang berubah sejak cursor ===
+async def fetch_changes(db: AsyncSession, email: Optional[str], since: int, limit: int) -> dict:
+    changes = (await db.execute(changes_query(email, since, limit))).all()
+    if not changes:
+        return {"changes": [], "next_cursor": since, "has_more": False}
+
+    # Booking yang berubah beberapa kali dalam satu halaman cukup dikirim sekali, di posisi perubahan terakhirnya
+    latest = {}
+    for seq, booking_id in changes:
+        latest.pop(booking_id, None)
+        latest[booking_id] = seq
+    stmt = select(*BOOKING_COLUMNS).where(Booking.id.in_(latest))
+    if email is not None:
+        stmt = stmt.where(Booking.email == email)
+    current = {row.id: row for row in (await db.execute(stmt)).all()}
+
+    items = []
+    for booking_id, seq in latest.items():
+        row = current.get(booking_id)
+        if row is None or row.status == StatusEnum.CANCELLED:
+            items.append({
+                "seq": seq,
+                "op": "tombstone",
+                "booking_id": booking_id,
+                "reason": ChangeOpEnum.CANCELLED.value if row is not None else "DELETED",
+            })
+        else:
+            items.append({"seq": seq, "op": "upsert", "booking": dict(zip(BOOKING_FIELDS, row))})
+    return {"changes": items, "next_cursor": changes[-1].id, "has_more": len(changes) == limit}
+
+# === Notifikasi in-process untuk stream SSE; worker lain tetap tertangkap lewat polling ===
+class ChangeNotifier:
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    # Dipanggil setelah commit, membangunkan semua stream yang sedang menunggu
+    def notify(self):
+        self._event.set()
+        self._event = asyncio.Event()
+
+    async def wait(self, timeout: float):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+change_notifier = ChangeNotifier()
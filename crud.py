@@ -0,0 +1,202 @@
+# sentracare-be-booking/crud.py
+# Helper query dan perubahan booking yang dipakai bersama oleh endpoint REST, bulk dan GraphQL
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from models import Booking, StatusEnum, JenisLayananEnum, ChangeOpEnum
+from outbox import enqueue_events, booking_event_payload, BOOKING_CONFIRMED, BOOKING_CANCELLED
+from slots import reserve_slot, release_slot, SlotPenuhError
+from changes import record_changes
+from analytics import stat_key, track_stats, apply_stat_deltas
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+def is_superadmin(user: dict) -> bool:
+    return str(user.get("role", "")).upper() == "SUPERADMIN"
+
+# === Batasi booking sesuai role: selain SUPERADMIN hanya boleh melihat booking miliknya ===
+def scope_bookings(stmt, user: dict):
+    if not is_superadmin(user):
+        stmt = stmt.where(Booking.email == user.get("email"))
+    return stmt
+
+# === Filter + keyset pagination (id desc) ===
+def filter_bookings(
+    stmt,
+    status: Optional[StatusEnum] = None,
+    tanggal_dari: Optional[date] = None,
+    tanggal_sampai: Optional[date] = None,
+    jenis_layanan: Optional[JenisLayananEnum] = None,
+    cursor: Optional[int] = None,
+):
+    if status is not None:
+        stmt = stmt.where(Booking.status == status)
+    if tanggal_dari is not None:
+        stmt = stmt.where(Booking.tanggal_pemeriksaan >= tanggal_dari)
+    if tanggal_sampai is not None:
+        stmt = stmt.where(Booking.tanggal_pemeriksaan <= tanggal_sampai)
+    if jenis_layanan is not None:
+        stmt = stmt.where(Booking.jenis_layanan == jenis_layanan)
+    # Cursor adalah id terakhir dari halaman sebelumnya, halaman berikutnya dimulai dari id yang lebih kecil
+    if cursor is not None:
+        stmt = stmt.where(Booking.id < cursor)
+    return stmt.order_by(Booking.id.desc())
+
+# columns: kolom yang di-select, default seluruh entity Booking
+def booking_list_query(user: dict, columns=None, **filters):
+    stmt = select(*columns) if columns else select(Booking)
+    return filter_bookings(scope_bookings(stmt, user), **filters)
+
+# === Hitung umur dari tanggal lahir ===
+def calculate_age(dob: Optional[date]) -> int:
+    if not dob:
+        return 0
+    today = date.today()
+    age = today.year - dob.year
+    if (today.month, today.day) < (dob.month, dob.day):
+        age -= 1
+    return max(age, 0)
+# === Jenis kelamin full dari booking ===
+def gender_full_from_booking(booking: Booking) -> str:
+    if booking.jenis_kelamin and booking.jenis_kelamin.value == "PEREMPUAN":
+        return "Perempuan"
+    return "Laki-laki"
+
+# Nilai kolom booking baru, dipakai untuk objek ORM maupun insert multi-row di bulk import
+def booking_values(data, email: str) -> dict:
+    return {
+        "nama_lengkap": data.nama_lengkap,
+        "tanggal_lahir": data.tanggal_lahir,
+        "jenis_kelamin": data.jenis_kelamin,
+        "nomor_telepon": data.nomor_telepon,
+        "email": email,
+        "alamat": data.alamat,
+        "jenis_layanan": data.jenis_layanan,
+        "tipe_layanan": data.tipe_layanan,
+        "tanggal_pemeriksaan": data.tanggal_pemeriksaan,
+        "jam_pemeriksaan": data.jam_pemeriksaan,
+        "catatan": data.catatan,
+        "status": StatusEnum.PENDING,
+    }
+
+def booking_from_request(data, email: str) -> Booking:
+    return Booking(**booking_values(data, email))
+
+def emr_patient_payload(booking: Booking, doctor_name: Optional[str], doctor_email: Optional[str]) -> dict:
+    return {
+        "full_name": booking.nama_lengkap,
+        "email": booking.email,
+        "phone_number": booking.nomor_telepon,
+        "gender": gender_full_from_booking(booking),
+        "age": calculate_age(booking.tanggal_lahir),
+        "address": booking.alamat,
+        "tipe_layanan": booking.tipe_layanan.value if booking.tipe_layanan else "",
+        "tanggal_pemeriksaan": str(booking.tanggal_pemeriksaan) if booking.tanggal_pemeriksaan else None,
+        "jam_pemeriksaan": str(booking.jam_pemeriksaan) if booking.jam_pemeriksaan else None,
+        "doctor_name": doctor_name,
+        "doctor_email": doctor_email,
+        "booking_id": booking.id
+    }
+
+# Booking sudah diubah transaksi lain setelah dibaca; seluruh transaksi pemanggil harus di-rollback
+class StatusConflictError(Exception):
+    pass
+
+# === Perubahan status yang ditulis sekaligus: satu UPDATE per kombinasi (status, dokter), insert multi-row
+# booking_changes dan outbox, satu upsert rollup. Dipakai per request maupun per chunk bulk ===
+class StatusBatch:
+    def __init__(self):
+        # booking_id -> (status, doctor_name) terakhir; booking yang muncul dua kali cukup di-update sekali
+        self.updates = {}
+        # booking_id -> (status, doctor_name) saat booking dibaca, dipakai sebagai guard UPDATE
+        self.previous = {}
+        # (jenis_layanan, tanggal, jam) -> jumlah slot yang dilepas oleh pembatalan
+        self.releases = Counter()
+        # (booking, op change feed, tipe event, payload) sesuai urutan transisi
+        self.transitions = []
+        self.stat_deltas = Counter()
+
+    def set_status(self, booking: Booking, status: StatusEnum, doctor_name: Optional[str]):
+        # Nilai baru ditulis lewat UPDATE di apply(); objek hanya diperbarui di memori agar flush ORM tidak
+        # mengirim UPDATE per booking
+        self.previous.setdefault(booking.id, (booking.status, booking.doctor_name))
+        set_committed_value(booking, "status", status)
+        set_committed_value(booking, "doctor_name", doctor_name)
+        self.updates[booking.id] = (status, doctor_name)
+
+    async def apply(self, db: AsyncSession):
+        # UPDATE status ditulis paling awal dengan guard nilai lama: jika transaksi lain sudah mengubah booking
+        # setelah dibaca, batch dibatalkan sebelum slot, change feed, outbox dan rollup ikut ditulis
+        groups = defaultdict(list)
+        for booking_id, values in self.updates.items():
+            groups[self.previous[booking_id], values].append(booking_id)
+        for ((old_status, old_doctor_name), (status, doctor_name)), ids in groups.items():
+            result = await db.execute(
+                update(Booking.__table__)
+                .where(
+                    Booking.id.in_(sorted(ids)),
+                    Booking.status == old_status,
+                    Booking.doctor_name.is_not_distinct_from(old_doctor_name),
+                )
+                .values(status=status, doctor_name=doctor_name)
+            )
+            if result.rowcount != len(ids):
+                raise StatusConflictError("Status booking sudah diubah oleh request lain, silakan coba lagi")
+        for (jenis_layanan, tanggal, jam), count in sorted(self.releases.items()):
+            if count:
+                await release_slot(db, jenis_layanan, tanggal, jam, count=count)
+        change_ids = await record_changes(db, [(booking, op) for booking, op, _, _ in self.transitions])
+        await enqueue_events(db, [
+            (booking.id, event_type, payload, change_id)
+            for (booking, _, event_type, payload), change_id in zip(self.transitions, change_ids)
+        ])
+        await apply_stat_deltas(db, self.stat_deltas)
+
+# === Ubah status booking (CONFIRMED / CANCELLED), commit dilakukan oleh pemanggil ===
+# booking harus dibaca dengan FOR UPDATE; StatusConflictError jika tetap berubah sebelum UPDATE (misal SQLite)
+# batch: StatusBatch milik pemanggil bulk, ditulis sekali per chunk; jika None langsung ditulis
+async def apply_status_change(
+    db: AsyncSession,
+    booking: Booking,
+    status_input: str,
+    doctor_name: Optional[str] = None,
+    doctor_email: Optional[str] = None,
+    batch: StatusBatch = None,
+):
+    pending = StatusBatch() if batch is None else batch
+    previous_status = booking.status
+    previous_key = stat_key(booking)
+    slot = (booking.jenis_layanan, booking.tanggal_pemeriksaan, booking.jam_pemeriksaan)
+    if status_input == "CONFIRMED":
+        # Konfirmasi ulang dengan dokter yang sama bukan transisi baru, tidak ada event yang dikirim ulang
+        if previous_status == StatusEnum.CONFIRMED and booking.doctor_name == doctor_name:
+            return
+        # Booking yang sebelumnya dibatalkan harus mendapat slot lagi; slot yang baru dilepas di batch yang sama dipakai dulu
+        if previous_status == StatusEnum.CANCELLED:
+            if pending.releases[slot]:
+                pending.releases[slot] -= 1
+            elif not await reserve_slot(db, *slot):
+                raise SlotPenuhError("Slot pemeriksaan sudah penuh")
+        pending.set_status(booking, StatusEnum.CONFIRMED, doctor_name)
+        # Push ke EMR dikirim oleh outbox dispatcher setelah commit, endpoint tidak menunggu patient-service
+        payload = emr_patient_payload(booking, doctor_name, doctor_email)
+        pending.transitions.append((booking, ChangeOpEnum.UPDATED, BOOKING_CONFIRMED, payload))
+
+    elif status_input == "CANCELLED":
+        if previous_status == StatusEnum.CANCELLED:
+            return
+        pending.releases[slot] += 1
+        pending.set_status(booking, StatusEnum.CANCELLED, booking.doctor_name)
+        pending.transitions.append((booking, ChangeOpEnum.CANCELLED, BOOKING_CANCELLED, booking_event_payload(booking)))
+
+    else:
+        return
+
+    await track_stats(db, previous_key, stat_key(booking), pending.stat_deltas)
+    if batch is None:
+        await pending.apply(db)
@@ -1,11 +1,120 @@
 # bagian database.py ini digunakan untuk kenektivitas ke MySQL database
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert, text, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import List
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+# Driver async yang dipakai untuk tiap driver sync (pymysql -> aiomysql, sqlite -> aiosqlite)
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str):
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername))
+
+# Setting pool koneksi, bisa diatur lewat environment
+def pool_options(url) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Engine sync hanya dipakai untuk migrasi Alembic, request handler memakai engine async
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+# === INSERT yang diabaikan jika melanggar unique key (INSERT IGNORE / ON CONFLICT DO NOTHING) ===
+def insert_ignore(table, dialect_name: str):
+    if dialect_name == "mysql":
+        return mysql.insert(table).prefix_with("IGNORE")
+    if dialect_name == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return insert(table)
+
+# === INSERT multi-row, mengembalikan id baris baru sesuai urutan rows ===
+# Per halaman satu statement INSERT ... VALUES (...), (...) agar tidak melewati batas parameter / paket
+INSERT_MANY_PAGE_SIZE = int(os.getenv("INSERT_MANY_PAGE_SIZE", "500"))
+
+async def insert_many(db, table, rows: List[dict]) -> List[int]:
+    dialect = db.bind.dialect
+    step, consecutive_ids = 1, True
+    if rows and dialect.name in ("mysql", "mariadb"):
+        # Id satu INSERT multi-row hanya dijamin berurutan pada innodb_autoinc_lock_mode 0 / 1. Mode 2
+        # (default MySQL 8) bisa menyelipkan id statement lain, jadi id diambil lewat RETURNING (MariaDB)
+        # atau insert per baris; set innodb_autoinc_lock_mode=1 agar bulk import tetap multi-row
+        step, lock_mode = (await db.execute(text("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode"))).one()
+        consecutive_ids = int(lock_mode) in (0, 1)
+    ids = []
+    for start in range(0, len(rows), INSERT_MANY_PAGE_SIZE):
+        page = rows[start:start + INSERT_MANY_PAGE_SIZE]
+        if dialect.name in ("mysql", "mariadb") and consecutive_ids:
+            # "Simple insert": InnoDB mengalokasikan seluruh id sekaligus, berurutan mulai dari
+            # LAST_INSERT_ID() dengan langkah auto_increment_increment
+            result = await db.execute(insert(table).values(page))
+            ids += [result.lastrowid + i * step for i in range(len(page))]
+        elif dialect.name == "sqlite":
+            # SQLite hanya punya satu writer, rowid satu statement berurutan dan lastrowid adalah baris terakhir
+            result = await db.execute(insert(table).values(page))
+            ids += range(result.lastrowid - len(page) + 1, result.lastrowid + 1)
+        elif dialect.insert_executemany_returning_sort_by_parameter_order:
+            result = await db.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), page)
+            ids += result.scalars().all()
+        else:
+            for row in page:
+                result = await db.execute(insert(table).values(row))
+                ids.append(result.inserted_primary_key[0])
+    return ids
+
+# === INSERT atau tambahkan ke kolom counter jika key sudah ada (ON DUPLICATE KEY / ON CONFLICT DO UPDATE) ===
+# rows: list dict berisi key_columns dan nilai tambahan untuk counter
+async def upsert_increment(db, table, rows: list, key_columns: list, counter: str):
+    dialect_name = db.bind.dialect.name
+    if dialect_name in ("mysql", "mariadb"):
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update({counter: table.c[counter] + stmt.inserted[counter]})
+    elif dialect_name in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect_name == "sqlite" else postgresql).insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=key_columns, set_={counter: table.c[counter] + stmt.excluded[counter]})
+    else:
+        # Database lain tanpa upsert: UPDATE per key, INSERT jika key belum ada
+        for row in rows:
+            await _increment_row(db, table, row, key_columns, counter)
+        return
+    await db.execute(stmt)
+
+async def _increment_row(db, table, row: dict, key_columns: list, counter: str):
+    increment = (
+        update(table)
+        .where(*(table.c[key] == row[key] for key in key_columns))
+        .values({counter: table.c[counter] + row[counter]})
+    )
+    if (await db.execute(increment)).rowcount:
+        return
+    try:
+        # Savepoint: jika transaksi lain baru saja meng-insert key yang sama, cukup ulangi UPDATE
+        async with db.begin_nested():
+            await db.execute(insert(table).values(row))
+    except IntegrityError:
+        await db.execute(increment)
@@ -1,7 +1,25 @@
 # sentracare-be-booking/graphql_schema.py
+import base64
+import logging
+import orjson
 import strawberry
-from typing import List, Optional
-from models import Booking
+from types import SimpleNamespace
+from datetime import date
+from typing import Annotated, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from strawberry.dataloader import DataLoader
+from strawberry.types import Info
+from strawberry.types.nodes import SelectedField
+from models import Booking, StatusEnum, JenisLayananEnum
+from crud import scope_bookings, filter_bookings, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from cache import booking_cache, CacheEntry
+from metrics import GraphQLMetricsExtension
+
+logger = logging.getLogger("booking.graphql")
+
+BookingStatus = strawberry.enum(StatusEnum, name="BookingStatus")
+JenisLayanan = strawberry.enum(JenisLayananEnum, name="JenisLayanan")
 
 @strawberry.type
 class BookingType:
@@ -14,49 +32,183 @@ class BookingType:
     doctorName: Optional[str]
 
     @staticmethod
-    def from_model(model: Booking) -> "BookingType":
+    def from_model(model) -> "BookingType":
+        # model bisa berupa Booking atau Row hasil select kolom tertentu saja,
+        # field yang tidak di-select tidak diminta client sehingga cukup diisi None
+        status = getattr(model, "status", None)
+        jenis_layanan = getattr(model, "jenis_layanan", None)
+        tanggal = getattr(model, "tanggal_pemeriksaan", None)
+        jam = getattr(model, "jam_pemeriksaan", None)
+
         # Ambil nilai string murni dari Enum
-        status_val = model.status.value if hasattr(model.status, "value") else str(model.status)
-        layanan_val = model.jenis_layanan.value if hasattr(model.jenis_layanan, "value") else str(model.jenis_layanan)
-        
+        status_val = status.value if hasattr(status, "value") else status
+        layanan_val = jenis_layanan.value if hasattr(jenis_layanan, "value") else jenis_layanan
+
         return BookingType(
             id=model.id,
-            namaLengkap=model.nama_lengkap,
-            jenisLayanan=layanan_val.replace("_", " ").title(), # Ubah MEDICAL_CHECKUP jadi Medical Checkup
-            tanggalPemeriksaan=str(model.tanggal_pemeriksaan),
-            jamPemeriksaan=str(model.jam_pemeriksaan),
-            status=status_val.capitalize(), # Ubah PENDING jadi Pending
-            doctorName=model.doctor_name
+            namaLengkap=getattr(model, "nama_lengkap", None),
+            jenisLayanan=layanan_val.replace("_", " ").title() if layanan_val else None, # Ubah MEDICAL_CHECKUP jadi Medical Checkup
+            tanggalPemeriksaan=str(tanggal) if tanggal is not None else None,
+            jamPemeriksaan=str(jam) if jam is not None else None,
+            status=status_val.capitalize() if status_val else None, # Ubah PENDING jadi Pending
+            doctorName=getattr(model, "doctor_name", None)
+        )
+
+# Kolom database untuk tiap field GraphQL, dipakai untuk select kolom sesuai field yang diminta
+FIELD_COLUMNS = {
+    "id": Booking.id,
+    "namaLengkap": Booking.nama_lengkap,
+    "jenisLayanan": Booking.jenis_layanan,
+    "tanggalPemeriksaan": Booking.tanggal_pemeriksaan,
+    "jamPemeriksaan": Booking.jam_pemeriksaan,
+    "status": Booking.status,
+    "doctorName": Booking.doctor_name,
+}
+
+@strawberry.type
+class PageInfo:
+    hasNextPage: bool
+    endCursor: Optional[str]
+
+@strawberry.type
+class BookingEdge:
+    cursor: str
+    node: BookingType
+
+@strawberry.type
+class BookingConnection:
+    edges: List[BookingEdge]
+    pageInfo: PageInfo
+
+def encode_cursor(booking_id: int) -> str:
+    return base64.b64encode(f"booking:{booking_id}".encode()).decode()
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        return int(base64.b64decode(cursor).decode().split(":", 1)[1])
+    except (ValueError, IndexError):
+        raise ValueError("Cursor tidak valid")
+
+# === Kumpulkan nama field yang diminta pada path tertentu (misal edges -> node), termasuk fragment ===
+def requested_fields(selections, path=()) -> set:
+    names = set()
+    for selection in selections:
+        if not isinstance(selection, SelectedField):
+            # Fragment spread / inline fragment
+            names |= requested_fields(selection.selections, path)
+        elif not path:
+            names.add(selection.name)
+        elif selection.name == path[0]:
+            names |= requested_fields(selection.selections, path[1:])
+    return names
+
+def projected_columns(info, path=()) -> list:
+    fields = requested_fields(info.selected_fields[0].selections, path)
+    columns = [Booking.id]
+    columns += [column for field, column in FIELD_COLUMNS.items() if field in fields and field != "id"]
+    return columns
+
+def current_user(info) -> Optional[dict]:
+    request = info.context["request"]
+    return getattr(request.state, "user", None)
+
+# === DataLoader: semua booking(id) dalam satu request digabung jadi satu query IN ===
+# Root field GraphQL di-resolve paralel, jadi setiap batch loader (dan setiap fetch_bookings) membuka
+# session sendiri; satu AsyncSession tidak boleh dipakai oleh beberapa query bersamaan
+def make_booking_loader(session_factory: async_sessionmaker, user: Optional[dict]) -> DataLoader:
+    async def load_bookings(ids: List[int]) -> List[Optional[BookingType]]:
+        if not user:
+            return [None] * len(ids)
+        stmt = scope_bookings(select(Booking), user).where(Booking.id.in_(ids))
+        async with session_factory() as db:
+            records = {b.id: b for b in (await db.execute(stmt)).scalars().all()}
+        return [BookingType.from_model(records[i]) if i in records else None for i in ids]
+    return DataLoader(load_fn=load_bookings)
+
+async def fetch_bookings(info, path, first, cursor, status, tanggal_dari, tanggal_sampai, jenis_layanan):
+    user = current_user(info)
+    if not user:
+        logger.debug("Query GraphQL tanpa user di request state")
+        return None
+    session_factory: async_sessionmaker = info.context["session_factory"]
+    columns = projected_columns(info, path)
+    first = max(1, min(first, MAX_PAGE_SIZE))
+
+    async def load():
+        stmt = filter_bookings(
+            scope_bookings(select(*columns), user),
+            status=status,
+            tanggal_dari=tanggal_dari,
+            tanggal_sampai=tanggal_sampai,
+            jenis_layanan=jenis_layanan,
+            cursor=cursor,
         )
+        # Ambil satu baris lebih untuk mengetahui apakah masih ada halaman berikutnya
+        async with session_factory() as db:
+            records = (await db.execute(stmt.limit(first + 1))).all()
+        logger.debug("Booking GraphQL dimuat", extra={"count": len(records), "role": user.get("role")})
+        body = orjson.dumps({"rows": [r._asdict() for r in records[:first]], "has_next": len(records) > first})
+        return CacheEntry(body)
+
+    variant = f"graphql:{','.join(c.key for c in columns)}:{first}:{cursor}:{status}:{tanggal_dari}:{tanggal_sampai}:{jenis_layanan}"
+    data = orjson.loads((await booking_cache.get_or_load(user, variant, load)).body)
+    return [SimpleNamespace(**row) for row in data["rows"]], data["has_next"]
 
 @strawberry.type
 class Query:
+    # Field lama: hasil dibatasi first, halaman berikutnya diambil dengan after = id booking terakhir
+    @strawberry.field(
+        deprecation_reason=(
+            f"Hasil dibatasi first (default {DEFAULT_PAGE_SIZE}, maksimal {MAX_PAGE_SIZE}). "
+            "Gunakan bookingsConnection untuk pagination dengan pageInfo."
+        )
+    )
+    async def bookings(
+        self,
+        info: Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Annotated[
+            Optional[int],
+            strawberry.argument(description="Id booking terakhir dari halaman sebelumnya (urutan id menurun)"),
+        ] = None,
+        status: Optional[BookingStatus] = None,
+        tanggal_dari: Optional[date] = None,
+        tanggal_sampai: Optional[date] = None,
+        jenis_layanan: Optional[JenisLayanan] = None,
+    ) -> List[BookingType]:
+        result = await fetch_bookings(info, (), first, after, status, tanggal_dari, tanggal_sampai, jenis_layanan)
+        if result is None:
+            return []
+        records, _ = result
+        return [BookingType.from_model(b) for b in records]
+
     @strawberry.field
-    def bookings(self, info) -> List[BookingType]:
-        from database import SessionLocal
-        db = SessionLocal()
-        try:
-            request = info.context["request"]
-            user = getattr(request.state, "user", None)
-            
-            if not user: 
-                print("DEBUG: No user found in request state")
-                return []
-            
-            # Ambil role dan pastikan tidak None sebelum di .upper()
-            user_role = str(user.get("role", "")).upper()
-            user_email = user.get("email")
-
-            query = db.query(Booking)
-            
-            # Logika: Jika BUKAN SuperAdmin, baru di-filter emailnya
-            if user_role != "SUPERADMIN":
-                query = query.filter(Booking.email == user_email)
-            
-            records = query.order_by(Booking.id.desc()).all()
-            print(f"DEBUG: Found {len(records)} bookings for role {user_role}")
-            return [BookingType.from_model(b) for b in records]
-        finally:
-            db.close()
-
-schema = strawberry.Schema(query=Query)
\ No newline at end of file
+    async def bookings_connection(
+        self,
+        info: Info,
+        first: int = DEFAULT_PAGE_SIZE,
+        after: Optional[str] = None,
+        status: Optional[BookingStatus] = None,
+        tanggal_dari: Optional[date] = None,
+        tanggal_sampai: Optional[date] = None,
+        jenis_layanan: Optional[JenisLayanan] = None,
+    ) -> BookingConnection:
+        result = await fetch_bookings(
+            info, ("edges", "node"), first, decode_cursor(after), status, tanggal_dari, tanggal_sampai, jenis_layanan
+        )
+        if result is None:
+            return BookingConnection(edges=[], pageInfo=PageInfo(hasNextPage=False, endCursor=None))
+        records, has_next = result
+        edges = [BookingEdge(cursor=encode_cursor(b.id), node=BookingType.from_model(b)) for b in records]
+        return BookingConnection(
+            edges=edges,
+            pageInfo=PageInfo(hasNextPage=has_next, endCursor=edges[-1].cursor if edges else None),
+        )
+
+    @strawberry.field
+    async def booking(self, info: Info, id: int) -> Optional[BookingType]:
+        return await info.context["booking_loader"].load(id)
+
+schema = strawberry.Schema(query=Query, extensions=[GraphQLMetricsExtension])
@@ -0,0 +1,233 @@
+# sentracare-be-booking/idempotency.py
+# Dukungan header Idempotency-Key untuk endpoint tulis (create booking, update status).
+# - Request pertama meng-klaim key dengan INSERT di transaksi yang sama dengan perubahan booking,
+#   response disimpan sebelum commit. Duplikat di worker lain menunggu lock unique key lalu
+#   menerima response yang sudah di-commit; jika transaksi pertama rollback, klaimnya ikut hilang.
+# - Duplikat bersamaan di proses yang sama menunggu future request pertama tanpa menyentuh database.
+# - Response yang sudah selesai di-cache in-process (LRU + TTL), replay tidak perlu query.
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Optional
+import orjson
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, insert_ignore
+from models import IdempotencyKey
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+IDEMPOTENCY_PURGE_BATCH = int(os.getenv("IDEMPOTENCY_PURGE_BATCH", "1000"))
+MAX_KEY_LENGTH = 255
+
+logger = logging.getLogger("booking.idempotency")
+
+class StoredResponse:
+    __slots__ = ("request_hash", "status_code", "body", "expires_at")
+
+    def __init__(self, request_hash: str, status_code: int, body: bytes, expires_at: float):
+        self.request_hash = request_hash
+        self.status_code = status_code
+        self.body = body
+        self.expires_at = expires_at
+
+    def to_response(self) -> Response:
+        return Response(self.body, status_code=self.status_code, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+
+def _sha256(value: bytes) -> str:
+    return hashlib.sha256(value).hexdigest()
+
+# Key dari client hanya unik per user dan endpoint (method + path, termasuk booking_id)
+def scoped_key(user: Optional[dict], method: str, path: str, client_key: str) -> str:
+    email = (user or {}).get("email") or "-"
+    return _sha256(f"{email}\n{method} {path}\n{client_key}".encode())
+
+# Sidik jari body request: key yang sama dengan body berbeda ditolak (422)
+def request_fingerprint(payload: dict) -> str:
+    return _sha256(orjson.dumps(jsonable_encoder(payload), option=orjson.OPT_SORT_KEYS))
+
+class Claim:
+    def __init__(self, key: Optional[str], request_hash: Optional[str]):
+        self.key = key
+        self.request_hash = request_hash
+        self.replay: Optional[Response] = None
+        self.stored: Optional[StoredResponse] = None
+
+    # === Simpan response di transaksi pemanggil, dipanggil tepat sebelum commit ===
+    async def complete(self, db: AsyncSession, content, status_code: int = 200):
+        if self.key is None:
+            return content
+        body = orjson.dumps(jsonable_encoder(content))
+        expires_at = datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL)
+        await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key_hash == self.key)
+            .values(status_code=status_code, response=body, expires_at=expires_at)
+        )
+        self.stored = StoredResponse(self.request_hash, status_code, body, time.time() + IDEMPOTENCY_TTL)
+        return Response(body, status_code=status_code, media_type="application/json")
+
+class IdempotencyStore:
+    def __init__(self, session_factory=AsyncSessionLocal, maxsize: int = IDEMPOTENCY_CACHE_SIZE):
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.replays = 0
+        self.coalesced = 0
+        self._task = None
+        self._stopping = asyncio.Event()
+
+    def _cached(self, key: str) -> Optional[StoredResponse]:
+        stored = self.entries.get(key)
+        if stored is None:
+            return None
+        if stored.expires_at <= time.time():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return stored
+
+    def _remember(self, key: str, stored: StoredResponse):
+        self.entries[key] = stored
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def _replay(self, stored: StoredResponse, request_hash: str) -> Response:
+        if stored.request_hash != request_hash:
+            raise HTTPException(status_code=422, detail="Idempotency-Key sudah dipakai untuk request yang berbeda")
+        self.replays += 1
+        return stored.to_response()
+
+    # === Klaim key di transaksi db; False jika key sudah dimiliki request lain yang sudah commit ===
+    async def _claim_row(self, db: AsyncSession, key: str, request_hash: str) -> bool:
+        now = datetime.utcnow()
+        values = {
+            "key_hash": key,
+            "request_hash": request_hash,
+            "status_code": None,
+            "response": None,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=IDEMPOTENCY_TTL),
+        }
+        result = await db.execute(insert_ignore(IdempotencyKey, db.bind.dialect.name).values(**values))
+        if result.rowcount:
+            return True
+        # Key lama yang sudah kedaluwarsa tetapi belum di-purge diambil alih
+        result = await db.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key_hash == key, IdempotencyKey.expires_at < now)
+            .values(**values)
+        )
+        return result.rowcount > 0
+
+    async def _load_row(self, db: AsyncSession, key: str) -> Optional[StoredResponse]:
+        # Locking read: di MySQL membaca versi commit terbaru, bukan snapshot transaksi
+        row = (await db.execute(
+            select(IdempotencyKey.request_hash, IdempotencyKey.status_code, IdempotencyKey.response, IdempotencyKey.expires_at)
+            .where(IdempotencyKey.key_hash == key)
+            .with_for_update()
+        )).one_or_none()
+        await db.rollback()
+        if row is None or row.status_code is None:
+            return None
+        ttl_left = (row.expires_at - datetime.utcnow()).total_seconds()
+        return StoredResponse(row.request_hash, row.status_code, row.response, time.time() + ttl_left)
+
+    # === Dipakai endpoint: async with store.claim(...) as claim: if claim.replay: return claim.replay ===
+    # Harus dipanggil sebelum query lain di session db agar klaim menjadi bagian awal transaksi.
+    @asynccontextmanager
+    async def claim(self, db: AsyncSession, client_key: Optional[str], scope: tuple, payload: dict):
+        if client_key is None:
+            yield Claim(None, None)
+            return
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key harus 1-{MAX_KEY_LENGTH} karakter")
+        key = scoped_key(*scope, client_key)
+        claim = Claim(key, request_fingerprint(payload))
+
+        # Tunggu request yang sama yang sedang diproses di proses ini, lalu cek lagi hasilnya
+        while True:
+            stored = self._cached(key)
+            if stored is not None:
+                claim.replay = self._replay(stored, claim.request_hash)
+                yield claim
+                return
+            inflight = self.inflight.get(key)
+            if inflight is None:
+                break
+            self.coalesced += 1
+            await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            if not await self._claim_row(db, key, claim.request_hash):
+                stored = await self._load_row(db, key)
+                if stored is None:
+                    raise HTTPException(status_code=409, detail="Request dengan Idempotency-Key ini sedang diproses")
+                self._remember(key, stored)
+                claim.replay = self._replay(stored, claim.request_hash)
+                yield claim
+                return
+            yield claim
+            # Sampai di sini hanya jika blok endpoint selesai tanpa exception (commit berhasil)
+            if claim.stored is not None:
+                self._remember(key, claim.stored)
+        finally:
+            del self.inflight[key]
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {"cached": len(self.entries), "inflight": len(self.inflight), "replays": self.replays, "coalesced": self.coalesced}
+
+    # === Purge key kedaluwarsa di background, per batch agar tidak mengunci tabel lama ===
+    async def purge_expired(self) -> int:
+        deleted = 0
+        while True:
+            async with self.session_factory() as db:
+                ids = (await db.execute(
+                    select(IdempotencyKey.id)
+                    .where(IdempotencyKey.expires_at < datetime.utcnow())
+                    .limit(IDEMPOTENCY_PURGE_BATCH)
+                )).scalars().all()
+                if not ids:
+                    return deleted
+                await db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+                await db.commit()
+            deleted += len(ids)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                deleted = await self.purge_expired()
+                if deleted:
+                    logger.info("Idempotency key kedaluwarsa dihapus", extra={"deleted": deleted})
+            except Exception:
+                logger.exception("Purge idempotency key gagal")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=IDEMPOTENCY_PURGE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task:
+            await self._task
+            self._task = None
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,56 @@
+# sentracare-be-booking/logging_config.py
+# Logging terstruktur (JSON per baris) dengan request id dari middleware
+import logging
+import os
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import orjson
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# json untuk produksi (dibaca log collector), text untuk development
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Diisi middleware untuk setiap request, "-" untuk log di luar request (dispatcher, startup)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Atribut bawaan LogRecord, selain ini dianggap field tambahan dari extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(data, default=str).decode()
+
+# === Logger "booking" dan turunannya (booking.outbox, booking.graphql, ...) ===
+def setup_logging():
+    logger = logging.getLogger("booking")
+    if logger.handlers:
+        return logger
+    handler = logging.StreamHandler(sys.stdout)
+    handler.addFilter(RequestIdFilter())
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(LOG_LEVEL)
+    # Tidak diteruskan ke root logger agar tidak tercetak dua kali bersama handler uvicorn
+    logger.propagate = False
+    return logger
@@ -1,30 +1,69 @@
 import os
-from fastapi import FastAPI, Request, HTTPException, Depends
+import time
+import uuid
+import orjson
+from fastapi import FastAPI, Request, HTTPException, Depends, Query, Header
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from database import SessionLocal, engine, Base
-from models import Booking, StatusEnum
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, async_engine
+from models import Booking, StatusEnum, JenisLayananEnum, ChangeOpEnum
 import strawberry
 from strawberry.fastapi import GraphQLRouter
-from jose import jwt, JWTError
-from graphql_schema import schema
+from auth import verify_token, token_cache, PUBLIC_PATHS
+from graphql_schema import schema, make_booking_loader
 from pydantic import BaseModel
 from typing import List, Optional
-from schemas import BookingRequest, UpdateStatusRequest
+from schemas import BookingRequest, UpdateStatusRequest, SlotCapacityRequest
+from crud import booking_from_request, apply_status_change, StatusConflictError, booking_list_query, scope_bookings, is_superadmin, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, STREAM_BATCH_SIZE
 from datetime import date
-import httpx
-# from rabbitmq import publish_booking_confirmed
+from serialization import BOOKING_COLUMNS, ORJSONResponse, encode_bookings, encode_ndjson
+from cache import booking_cache, CacheEntry, etag_matches
+from contextlib import asynccontextmanager
+from outbox import outbox_dispatcher, enqueue_events, booking_event_payload, BOOKING_CREATED
+from rabbitmq import booking_publisher, RABBITMQ_ENABLED
+from bulk import bulk_create, bulk_update_status, BulkFormatError
+from slots import reserve_slot, available_slots, set_capacity, SlotPenuhError, MAX_SLOT_RANGE_DAYS
+from changes import (
+    record_changes, fetch_changes, change_notifier,
+    CHANGE_FEED_PAGE_SIZE, CHANGE_FEED_MAX_PAGE_SIZE, CHANGE_FEED_POLL_INTERVAL, CHANGE_FEED_STREAM_TIMEOUT, CHANGE_FEED_HEARTBEAT,
+)
+from analytics import stat_key, track_stats, booking_analytics, DIMENSIONS, ANALYTICS_MAX_RANGE_DAYS
+from idempotency import idempotency_store
+from logging_config import setup_logging, request_id_var
+from metrics import (
+    METRICS_ENABLED, CONTENT_TYPE_LATEST, RequestStats, request_stats_var,
+    instrument_engine, register_runtime_collector, route_label, observe_request, render_metrics,
+)
+
+OUTBOX_DISPATCHER_ENABLED = os.getenv("OUTBOX_DISPATCHER_ENABLED", "true").lower() == "true"
 
-# SECRET_KEY harus sama dengan Auth Service
-SECRET_KEY = os.getenv("AUTH_SECRET_KEY", "changeme")
-ALGORITHM = os.getenv("AUTH_ALGORITHM", "HS256")
-ISSUER = os.getenv("AUTH_ISSUER", "sentracare-auth")
-AUDIENCE = os.getenv("AUTH_AUDIENCE", "sentracare-services")
+setup_logging()
+if METRICS_ENABLED:
+    instrument_engine(async_engine.sync_engine)
+    register_runtime_collector(async_engine.sync_engine, token_cache, booking_cache)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if RABBITMQ_ENABLED:
+        await booking_publisher.start()
+        outbox_dispatcher.publisher = booking_publisher
+    if OUTBOX_DISPATCHER_ENABLED:
+        await outbox_dispatcher.start()
+    await idempotency_store.start()
+    yield
+    await idempotency_store.stop()
+    if OUTBOX_DISPATCHER_ENABLED:
+        await outbox_dispatcher.stop()
+    if RABBITMQ_ENABLED:
+        await booking_publisher.stop()
 
 app = FastAPI(
     title="Sentracare Booking Service", 
     description="API untuk booking layanan di SentraCare", 
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # app.add_middleware(
@@ -35,16 +74,18 @@ app = FastAPI(
 #     allow_headers=["*"],
 # )
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
-Base.metadata.create_all(bind=engine)
+# Skema database dikelola dengan Alembic: jalankan `alembic upgrade head` sebelum start
 
 # ==== GraphQL Setup ====
-graphql_app = GraphQLRouter(schema)
+# DataLoader dibuat per request; resolver membuka session sendiri dari session_factory karena root field berjalan paralel
+async def get_graphql_context(request: Request):
+    user = getattr(request.state, "user", None)
+    return {"session_factory": AsyncSessionLocal, "booking_loader": make_booking_loader(AsyncSessionLocal, user)}
+
+graphql_app = GraphQLRouter(schema, context_getter=get_graphql_context)
 app.include_router(
     graphql_app, 
     prefix="/booking/graphql",
@@ -55,117 +96,218 @@ app.include_router(
 async def add_user_to_request(request: Request, call_next):
     auth = request.headers.get("Authorization")
     request.state.user = None
+    if request.method == "OPTIONS" or request.url.path in PUBLIC_PATHS:
+        return await call_next(request)
     if auth and auth.startswith("Bearer "):
         token = auth.split(" ")[1]
-        try:
-            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], audience=AUDIENCE, issuer=ISSUER) 
-            request.state.user = claims
-        except JWTError:
-            request.state.user = None
+        # Claims diambil dari cache jika token yang sama sudah pernah diverifikasi
+        request.state.user = verify_token(token)
     return await call_next(request)
 
-# === Helper Functions ===
-# === Hitung umur dari tanggal lahir ===
-def calculate_age(dob: Optional[date]) -> int:
-    if not dob:
-        return 0
-    today = date.today()
-    age = today.year - dob.year
-    if (today.month, today.day) < (dob.month, dob.day):
-        age -= 1
-    return max(age, 0)
-# === Jenis kelamin full dari booking ===
-def gender_full_from_booking(booking: Booking) -> str:
-    if booking.jenis_kelamin and booking.jenis_kelamin.value == "PEREMPUAN":
-        return "Perempuan"
-    return "Laki-laki"
+# Didaftarkan setelah middleware auth sehingga menjadi lapisan terluar dan ikut mengukur verifikasi token
+@app.middleware("http")
+async def observe_request_metrics(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    if not METRICS_ENABLED:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+    stats = RequestStats()
+    request_stats_var.set(stats)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        observe_request(request.method, route_label(request.scope), status, time.perf_counter() - started, stats)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
 
 # === ENDPOINT UNTUK PASIEN MEMBUAT BOOKING ===
 @app.post(
     "/booking/create-booking",
     tags=["Booking"],
     summary="Buat booking baru",
-    description="Endpoint untuk membuat booking baru oleh pasien"
+    description=(
+        "Endpoint untuk membuat booking baru oleh pasien. Kirim header Idempotency-Key agar retry "
+        "dari client tidak membuat booking ganda (response pertama dikirim ulang)."
+    ),
     )
-async def create_booking(data: BookingRequest, request: Request, db: Session = Depends(get_db)):
+async def create_booking(
+    data: BookingRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
     user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(status_code=401, detail="Sesi berakhir, silakan login ulang")
 
     try:
-        new_booking = Booking(
-            nama_lengkap=data.nama_lengkap,
-            tanggal_lahir=data.tanggal_lahir,
-            jenis_kelamin=data.jenis_kelamin,
-            nomor_telepon=data.nomor_telepon,
-            email=user.get("email"),
-            alamat=data.alamat,
-            jenis_layanan=data.jenis_layanan,
-            tipe_layanan=data.tipe_layanan,
-            tanggal_pemeriksaan=data.tanggal_pemeriksaan,
-            jam_pemeriksaan=data.jam_pemeriksaan,
-            catatan=data.catatan,
-            status=StatusEnum.PENDING
-        )
-        db.add(new_booking)
-        db.commit()
-        db.refresh(new_booking)
-        return {"message": "Booking berhasil", "booking": new_booking}
+        # Retry dengan Idempotency-Key yang sama menerima response pertama tanpa membuat booking baru
+        async with idempotency_store.claim(db, idempotency_key, (user, request.method, request.url.path), data.model_dump()) as claim:
+            if claim.replay:
+                return claim.replay
+
+            # Reservasi slot dan insert booking berada dalam satu transaksi
+            if not await reserve_slot(db, data.jenis_layanan, data.tanggal_pemeriksaan, data.jam_pemeriksaan):
+                raise HTTPException(status_code=409, detail="Slot pemeriksaan sudah penuh, silakan pilih jadwal lain")
+
+            new_booking = booking_from_request(data, user.get("email"))
+            db.add(new_booking)
+            await db.flush()
+            change_ids = await record_changes(db, [(new_booking, ChangeOpEnum.CREATED)])
+            await enqueue_events(db, [(new_booking.id, BOOKING_CREATED, booking_event_payload(new_booking), change_ids[0])])
+            await track_stats(db, None, stat_key(new_booking))
+            # Refresh sebelum commit agar response lengkap bisa disimpan bersama booking-nya
+            await db.refresh(new_booking)
+            response = await claim.complete(db, {"message": "Booking berhasil", "booking": new_booking})
+            await db.commit()
+        await booking_cache.invalidate([new_booking.email])
+        outbox_dispatcher.notify()
+        change_notifier.notify()
+        return response
+    except HTTPException:
+        await db.rollback()
+        raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put(
     "/booking/{booking_id}/status",
     tags=["Booking"],
     summary="Update status booking",
-    description="Endpoint untuk mengupdate status booking (CONFIRMED atau CANCELLED)"
+    description=(
+        "Endpoint untuk mengupdate status booking (CONFIRMED atau CANCELLED). "
+        "Mendukung header Idempotency-Key seperti create booking."
+    ),
     )
-async def update_booking_status(booking_id: int, data: UpdateStatusRequest, request: Request, db: Session = Depends(get_db)):
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking tidak ditemukan")
-
+async def update_booking_status(
+    booking_id: int,
+    data: UpdateStatusRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    user = getattr(request.state, "user", None)
     status_input = data.status.upper()
     try:
-        if status_input == "CONFIRMED":
-            booking.status = StatusEnum.CONFIRMED
-            booking.doctor_name = data.doctor_name
-            age = calculate_age(booking.tanggal_lahir)
-            gender_full = gender_full_from_booking(booking)
-
-            patient_payload = {
-                "full_name": booking.nama_lengkap,
-                "email": booking.email,
-                "phone_number": booking.nomor_telepon,
-                "gender": gender_full,  
-                "age": age,
-                "address": booking.alamat,
-                "tipe_layanan": booking.tipe_layanan.value if booking.tipe_layanan else "",
-                "tanggal_pemeriksaan": str(booking.tanggal_pemeriksaan) if booking.tanggal_pemeriksaan else None,
-                "jam_pemeriksaan": str(booking.jam_pemeriksaan) if booking.jam_pemeriksaan else None,
-                "doctor_name": data.doctor_name, 
-                "doctor_email": data.doctor_email,
-                "booking_id": booking.id
-            }
-            # await publish_booking_confirmed(patient_payload)
-
-            async with httpx.AsyncClient() as client:
-                try:
-                    await client.post("http://patient-service:8000/patients/internal-register", json=patient_payload)
-                except Exception as e:
-                    print(f"Gagal push ke EMR: {e}")
-        
-        elif status_input == "CANCELLED":
-            booking.status = StatusEnum.CANCELLED
-        
-        db.commit()
-        db.refresh(booking)
-        return booking
+        async with idempotency_store.claim(db, idempotency_key, (user, request.method, request.url.path), data.model_dump()) as claim:
+            if claim.replay:
+                return claim.replay
+
+            # Lock baris booking agar transisi paralel pada booking yang sama berjalan bergantian
+            booking = await db.get(Booking, booking_id, with_for_update=True)
+            if not booking:
+                raise HTTPException(status_code=404, detail="Booking tidak ditemukan")
+
+            await apply_status_change(db, booking, status_input, data.doctor_name, data.doctor_email)
+            await db.flush()
+            await db.refresh(booking)
+            response = await claim.complete(db, booking)
+            await db.commit()
+        await booking_cache.invalidate([booking.email])
+        outbox_dispatcher.notify()
+        change_notifier.notify()
+        return response
+    except HTTPException:
+        await db.rollback()
+        raise
+    except (SlotPenuhError, StatusConflictError) as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
+# === ENDPOINT BULK (CLINIC / MEDICAL CHECKUP KORPORAT) ===
+@app.post(
+    "/booking/bulk-create",
+    tags=["Booking"],
+    summary="Bulk import booking",
+    description=(
+        "Endpoint SUPERADMIN untuk membuat banyak booking sekaligus. Body berupa JSON array, "
+        "NDJSON (application/x-ndjson) atau CSV dengan header (text/csv) berisi baris BookingRequest "
+        "ditambah kolom email opsional. Hasil dikembalikan per baris."
+    )
+    )
+async def bulk_create_bookings(request: Request, db: AsyncSession = Depends(get_db)):
+    user = getattr(request.state, "user", None)
+    if not user or not is_superadmin(user):
+        raise HTTPException(status_code=403, detail="Hanya SUPERADMIN yang dapat melakukan bulk import")
+    try:
+        result = await bulk_create(request, db, user.get("email"))
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Notifikasi dikirim sekali untuk seluruh batch, dispatcher mengirim event per batch
+    outbox_dispatcher.notify()
+    change_notifier.notify()
+    return result
+
+@app.put(
+    "/booking/bulk-status",
+    tags=["Booking"],
+    summary="Bulk update status booking",
+    description=(
+        "Endpoint SUPERADMIN untuk mengupdate status banyak booking sekaligus. Body berupa JSON array, "
+        "NDJSON atau CSV dengan kolom booking_id, status, doctor_name, doctor_email."
+    )
+    )
+async def bulk_update_booking_status(request: Request, db: AsyncSession = Depends(get_db)):
+    user = getattr(request.state, "user", None)
+    if not user or not is_superadmin(user):
+        raise HTTPException(status_code=403, detail="Hanya SUPERADMIN yang dapat melakukan bulk update")
+    try:
+        result = await bulk_update_status(request, db)
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    outbox_dispatcher.notify()
+    change_notifier.notify()
+    return result
+
+# === ENDPOINT SLOT PEMERIKSAAN ===
+@app.get(
+    "/booking/slots",
+    tags=["Slot"],
+    summary="Daftar slot tersedia",
+    description="Endpoint untuk melihat sisa kapasitas slot pemeriksaan per jenis layanan dalam rentang tanggal"
+    )
+async def get_available_slots(
+    request: Request,
+    jenis_layanan: JenisLayananEnum,
+    tanggal_dari: date,
+    tanggal_sampai: date,
+    db: AsyncSession = Depends(get_db),
+):
+    user = getattr(request.state, "user", None)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if tanggal_sampai < tanggal_dari or (tanggal_sampai - tanggal_dari).days >= MAX_SLOT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Rentang tanggal maksimal {MAX_SLOT_RANGE_DAYS} hari")
+    return await available_slots(db, jenis_layanan, tanggal_dari, tanggal_sampai)
+
+@app.put(
+    "/booking/slots/capacity",
+    tags=["Slot"],
+    summary="Atur kapasitas slot",
+    description="Endpoint SUPERADMIN untuk mengatur kapasitas slot per jenis layanan (opsional per jam)"
+    )
+async def update_slot_capacity(data: SlotCapacityRequest, request: Request, db: AsyncSession = Depends(get_db)):
+    user = getattr(request.state, "user", None)
+    if not user or not is_superadmin(user):
+        raise HTTPException(status_code=403, detail="Hanya SUPERADMIN yang dapat mengatur kapasitas slot")
+    await set_capacity(db, data.jenis_layanan, data.jam_pemeriksaan, data.capacity)
+    await db.commit()
+    return {"message": "Kapasitas slot diperbarui"}
+
 class BookingResponse(BaseModel):
     id: int
     nama_lengkap: str
@@ -192,59 +334,208 @@ class BookingResponse(BaseModel):
     "/api/bookings/full", 
     tags=["Booking"],
     summary="Dapatkan daftar booking lengkap",
-    description="Endpoint untuk mendapatkan daftar booking dengan data lengkap",
-    response_model=List[BookingResponse])
-async def get_full_bookings(request: Request, db: Session = Depends(get_db)):
+    description=(
+        "Endpoint untuk mendapatkan daftar booking dengan data lengkap. "
+        "Hasil dipaginasi dengan cursor (id), cursor halaman berikutnya dikirim lewat header X-Next-Cursor. "
+        "Gunakan stream=true untuk menerima seluruh hasil sebagai NDJSON. "
+        "Mendukung ETag / If-None-Match (304 jika data tidak berubah)."
+    ),
+    response_model=List[BookingResponse],
+    response_class=ORJSONResponse)
+async def get_full_bookings(
+    request: Request,
+    cursor: Optional[int] = Query(None, description="id terakhir dari halaman sebelumnya"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[StatusEnum] = None,
+    tanggal_dari: Optional[date] = None,
+    tanggal_sampai: Optional[date] = None,
+    jenis_layanan: Optional[JenisLayananEnum] = None,
+    stream: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
     user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    query = db.query(Booking)
-    if user.get("role").upper() != "SUPERADMIN":
-        query = query.filter(Booking.email == user.get("email"))
-    
-    bookings = query.order_by(Booking.id.desc()).all()
-    
-    result = []
-    for booking in bookings:
-        booking_dict = {
-            "id": booking.id,
-            "nama_lengkap": booking.nama_lengkap,
-            "tanggal_lahir": booking.tanggal_lahir,
-            "jenis_kelamin": booking.jenis_kelamin.value if booking.jenis_kelamin else None,
-            "nomor_telepon": booking.nomor_telepon,
-            "email": booking.email,
-            "alamat": booking.alamat,
-            "jenis_layanan": booking.jenis_layanan.value if booking.jenis_layanan else None,
-            "tipe_layanan": booking.tipe_layanan.value if booking.tipe_layanan else None,
-            "tanggal_pemeriksaan": booking.tanggal_pemeriksaan,
-            "jam_pemeriksaan": str(booking.jam_pemeriksaan) if booking.jam_pemeriksaan else None,
-            "catatan": booking.catatan,
-            "status": booking.status.value if booking.status else "PENDING",
-            "doctor_name": booking.doctor_name,
-            "created_at": str(booking.created_at) if booking.created_at else None,
-            "updated_at": str(booking.updated_at) if booking.updated_at else None,
-        }
-        try:
-            validated_booking = BookingResponse(**booking_dict)
-            result.append(validated_booking)
-        except Exception as e:
-            print(f"Error validating booking {booking.id}: {e}")
-    
-    return result
+    stmt = booking_list_query(
+        user,
+        columns=BOOKING_COLUMNS,
+        status=status,
+        tanggal_dari=tanggal_dari,
+        tanggal_sampai=tanggal_sampai,
+        jenis_layanan=jenis_layanan,
+        cursor=cursor,
+    )
+
+    if stream:
+        return StreamingResponse(stream_bookings_ndjson(stmt), media_type="application/x-ndjson")
+
+    async def load():
+        rows = (await db.execute(stmt.limit(limit))).all()
+        next_cursor = rows[-1].id if len(rows) == limit else None
+        return CacheEntry(encode_bookings(rows), {"next_cursor": next_cursor})
+
+    variant = f"full:{cursor}:{limit}:{status}:{tanggal_dari}:{tanggal_sampai}:{jenis_layanan}"
+    entry = await booking_cache.get_or_load(user, variant, load)
+    response = cached_response(request, entry)
+    if entry.meta.get("next_cursor"):
+        response.headers["X-Next-Cursor"] = str(entry.meta["next_cursor"])
+    return response
+
+# === Response dari cache entry: 304 jika ETag sama dengan If-None-Match ===
+def cached_response(request: Request, entry: CacheEntry) -> Response:
+    if etag_matches(request.headers.get("If-None-Match"), entry.etag):
+        return Response(status_code=304, headers={"ETag": entry.etag})
+    # Response dikembalikan langsung: FastAPI tidak memvalidasi ulang lewat response_model
+    return ORJSONResponse(entry.body, headers={"ETag": entry.etag})
+
+# === Streaming NDJSON: baca dari server-side cursor per batch, memory tetap konstan ===
+async def stream_bookings_ndjson(stmt):
+    # Pakai session sendiri karena generator masih berjalan setelah dependency get_db selesai
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield encode_ndjson(partition)
 
 # Endpoint khusus untuk patient service EMR
 @app.get(
     "/api/bookings/emr-patients", 
     tags=["Booking"],
     summary="Dapatkan daftar booking untuk EMR (rekam medis) pasien",
-    description="Endpoint untuk mendapatkan daftar booking dengan data lengkap untuk EMR (rekam medis) pasien",
-    response_model=List[dict])
-async def get_bookings_for_emr(request: Request, db: Session = Depends(get_db)):
+    description=(
+        "Endpoint untuk mendapatkan daftar booking dengan data lengkap untuk EMR (rekam medis) pasien. "
+        "Untuk sinkronisasi berkala gunakan /api/bookings/changes agar hanya booking yang berubah yang diambil."
+    ),
+    response_model=List[dict],
+    response_class=ORJSONResponse)
+async def get_bookings_for_emr(request: Request, db: AsyncSession = Depends(get_db)):
     user = getattr(request.state, "user", None)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     
-    query = db.query(Booking)
-    if user.get("role").upper() != "SUPERADMIN":
-        query = query.filter(Booking.email == user.get("email"))
+    async def load():
+        rows = (await db.execute(scope_bookings(select(*BOOKING_COLUMNS), user).order_by(Booking.id.desc()))).all()
+        return CacheEntry(encode_bookings(rows))
+
+    entry = await booking_cache.get_or_load(user, "emr", load)
+    return cached_response(request, entry)
+
+# === CHANGE FEED: SINKRONISASI INKREMENTAL ===
+@app.get(
+    "/api/bookings/changes",
+    tags=["Booking"],
+    summary="Perubahan booking sejak cursor",
+    description=(
+        "Endpoint delta sync: mengembalikan booking yang dibuat atau diubah setelah cursor `since` "
+        "(mulai dari 0 untuk sinkronisasi awal). Booking yang dibatalkan dikirim sebagai tombstone. "
+        "Simpan `next_cursor` lalu panggil lagi selama `has_more` bernilai true."
+    ),
+    response_class=ORJSONResponse)
+async def get_booking_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="next_cursor dari response sebelumnya"),
+    limit: int = Query(CHANGE_FEED_PAGE_SIZE, ge=1, le=CHANGE_FEED_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    user = getattr(request.state, "user", None)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return ORJSONResponse(await fetch_changes(db, feed_email(user), since, limit))
+
+@app.get(
+    "/api/bookings/changes/stream",
+    tags=["Booking"],
+    summary="Stream perubahan booking (SSE)",
+    description=(
+        "Server-Sent Events long-poll: setiap event `changes` berisi satu halaman delta dengan id event = cursor. "
+        "Koneksi ditutup setelah beberapa saat, client menyambung lagi dengan header Last-Event-ID."
+    ))
+async def stream_booking_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="default: header Last-Event-ID atau 0"),
+    limit: int = Query(CHANGE_FEED_PAGE_SIZE, ge=1, le=CHANGE_FEED_MAX_PAGE_SIZE),
+):
+    user = getattr(request.state, "user", None)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if since is None:
+        last_event_id = request.headers.get("Last-Event-ID", "")
+        since = int(last_event_id) if last_event_id.isdigit() else 0
+    return StreamingResponse(
+        change_events(request, feed_email(user), since, limit),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# SUPERADMIN menerima perubahan semua pasien, role lain hanya booking miliknya
+def feed_email(user: dict) -> Optional[str]:
+    return None if is_superadmin(user) else user.get("email")
+
+async def change_events(request: Request, email: Optional[str], since: int, limit: int):
+    deadline = time.monotonic() + CHANGE_FEED_STREAM_TIMEOUT
+    last_sent = time.monotonic()
+    yield f"retry: {int(CHANGE_FEED_POLL_INTERVAL * 1000)}\n\n".encode()
+    while time.monotonic() < deadline and not await request.is_disconnected():
+        # Session dibuka per polling agar koneksi tidak ditahan selama stream menunggu
+        async with AsyncSessionLocal() as db:
+            page = await fetch_changes(db, email, since, limit)
+        if page["changes"]:
+            since = page["next_cursor"]
+            last_sent = time.monotonic()
+            yield b"id: %d\nevent: changes\ndata: %s\n\n" % (since, orjson.dumps(page))
+            if page["has_more"]:
+                continue
+        elif time.monotonic() - last_sent >= CHANGE_FEED_HEARTBEAT:
+            last_sent = time.monotonic()
+            yield b": keep-alive\n\n"
+        await change_notifier.wait(min(CHANGE_FEED_POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+# === ANALITIK DASHBOARD (DARI TABEL ROLLUP) ===
+@app.get(
+    "/api/bookings/analytics",
+    tags=["Analytics"],
+    summary="Jumlah booking per dimensi",
+    description=(
+        "Endpoint SUPERADMIN untuk dashboard: jumlah booking dalam rentang tanggal pemeriksaan, dikelompokkan "
+        f"menurut group_by (kombinasi dari: {', '.join(DIMENSIONS)}; kosong untuk total). "
+        "Dihitung dari tabel rollup, bukan dari scan seluruh booking."
+    ),
+    response_class=ORJSONResponse)
+async def get_booking_analytics(
+    request: Request,
+    tanggal_dari: date,
+    tanggal_sampai: date,
+    group_by: str = Query("tanggal,status", description="contoh: tanggal,jenis_layanan atau doctor"),
+    jenis_layanan: Optional[JenisLayananEnum] = None,
+    status: Optional[StatusEnum] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    user = getattr(request.state, "user", None)
+    if not user or not is_superadmin(user):
+        raise HTTPException(status_code=403, detail="Hanya SUPERADMIN yang dapat melihat analitik booking")
+    if tanggal_sampai < tanggal_dari or (tanggal_sampai - tanggal_dari).days >= ANALYTICS_MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Rentang tanggal maksimal {ANALYTICS_MAX_RANGE_DAYS} hari")
+    dimensions = list(dict.fromkeys(name.strip() for name in group_by.split(",") if name.strip()))
+    unknown = [name for name in dimensions if name not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"group_by tidak dikenal: {', '.join(unknown)}")
+    rows = await booking_analytics(db, dimensions, tanggal_dari, tanggal_sampai, jenis_layanan, status)
+    return ORJSONResponse({
+        "tanggal_dari": tanggal_dari,
+        "tanggal_sampai": tanggal_sampai,
+        "group_by": dimensions,
+        "total": sum(row["jumlah"] for row in rows),
+        "rows": rows,
+    })
+
+@app.get(
+    "/api/bookings/cache-stats",
+    tags=["Booking"],
+    summary="Statistik cache list booking",
+    description="Endpoint SUPERADMIN untuk melihat hit rate dan stale read cache list booking"
+    )
+async def get_cache_stats(request: Request):
+    user = getattr(request.state, "user", None)
+    if not user or not is_superadmin(user):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return booking_cache.stats()
@@ -0,0 +1,192 @@
+# sentracare-be-booking/metrics.py
+# Metrik Prometheus: latency per route dan operasi GraphQL, jumlah + durasi query per request,
+# panggilan ke patient-service, saturasi pool koneksi, dan statistik cache.
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+from prometheus_client import Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from strawberry.extensions import SchemaExtension
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# Request dengan query lebih dari ini dicatat sebagai warning (indikasi pola N+1)
+DB_QUERY_WARN_COUNT = int(os.getenv("DB_QUERY_WARN_COUNT", "25"))
+
+logger = logging.getLogger("booking.metrics")
+
+REQUEST_LATENCY = Histogram(
+    "booking_http_request_duration_seconds",
+    "Latency request HTTP per route",
+    ["method", "route", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "booking_http_request_db_queries",
+    "Jumlah query database per request HTTP",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "booking_http_request_db_duration_seconds",
+    "Total waktu query database per request HTTP",
+    ["route"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "booking_db_query_duration_seconds",
+    "Durasi satu query database",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+GRAPHQL_LATENCY = Histogram(
+    "booking_graphql_operation_duration_seconds",
+    "Latency operasi GraphQL",
+    ["operation", "type", "status"],
+)
+# Error rate = count dengan outcome != success dibagi total count
+EMR_LATENCY = Histogram(
+    "booking_emr_request_duration_seconds",
+    "Durasi panggilan ke patient-service (EMR)",
+    ["outcome"],
+)
+
+# Child histogram per label di-cache: labels() mengambil lock dan membangun tuple setiap dipanggil
+_DB_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+_DB_QUERY_CHILDREN = {op: DB_QUERY_SECONDS.labels(op) for op in _DB_OPERATIONS + ("OTHER",)}
+_request_children = {}
+
+def _request_histograms(method: str, route: str, status: int):
+    key = (method, route, status)
+    children = _request_children.get(key)
+    if children is None:
+        children = (
+            REQUEST_LATENCY.labels(method, route, str(status)),
+            REQUEST_DB_QUERIES.labels(route),
+            REQUEST_DB_SECONDS.labels(route),
+        )
+        _request_children[key] = children
+    return children
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+# Diisi middleware; None di luar request (dispatcher outbox, migrasi)
+request_stats_var: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+# === Hook SQLAlchemy: waktu mulai disimpan di conn.info, dihitung saat query selesai ===
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    child = _DB_QUERY_CHILDREN.get(statement.lstrip()[:6].upper()) or _DB_QUERY_CHILDREN["OTHER"]
+    child.observe(elapsed)
+    stats = request_stats_var.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+def _handle_error(exception_context):
+    # Query gagal tidak memanggil after_cursor_execute, buang waktu mulainya
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+# Route template (/booking/{booking_id}/status), bukan path asli, agar jumlah label tetap kecil
+def route_label(scope: dict) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    # Route root dari router yang di-include (GraphQL) punya path kosong, pakai path request-nya
+    return route.path or scope["path"]
+
+def observe_request(method: str, route: str, status: int, elapsed: float, stats: RequestStats):
+    latency, db_queries, db_seconds = _request_histograms(method, route, status)
+    latency.observe(elapsed)
+    db_queries.observe(stats.queries)
+    db_seconds.observe(stats.db_seconds)
+    if stats.queries > DB_QUERY_WARN_COUNT:
+        logger.warning(
+            "Request menjalankan terlalu banyak query",
+            extra={"route": route, "db_queries": stats.queries, "db_ms": round(stats.db_seconds * 1000, 2)},
+        )
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Request selesai",
+            extra={
+                "method": method,
+                "route": route,
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 2),
+                "db_queries": stats.queries,
+                "db_ms": round(stats.db_seconds * 1000, 2),
+            },
+        )
+
+def observe_emr_call(elapsed: float, outcome: str):
+    EMR_LATENCY.labels(outcome).observe(elapsed)
+
+# === Extension Strawberry: latency per operasi GraphQL ===
+class GraphQLMetricsExtension(SchemaExtension):
+    def on_operation(self):
+        started = time.perf_counter()
+        yield
+        if not METRICS_ENABLED:
+            return
+        ctx = self.execution_context
+        try:
+            operation_type = ctx.operation_type.value
+        except Exception:
+            # Dokumen tidak valid, tipe operasi tidak bisa ditentukan
+            operation_type = "unknown"
+        # Error validasi/parsing tercatat di ctx.errors, error resolver di ctx.result.errors
+        failed = ctx.errors or (ctx.result is not None and ctx.result.errors)
+        status = "error" if failed else "success"
+        GRAPHQL_LATENCY.labels(ctx.operation_name or "anonymous", operation_type, status).observe(
+            time.perf_counter() - started
+        )
+
+# === Collector untuk nilai yang dibaca saat scrape: pool koneksi dan statistik cache ===
+class RuntimeCollector:
+    def __init__(self, engine, token_cache, booking_cache):
+        self.engine = engine
+        self.token_cache = token_cache
+        self.booking_cache = booking_cache
+
+    def collect(self):
+        pool = self.engine.pool
+        # Pool SQLite tertentu (StaticPool) tidak punya counter, gauge dilewati
+        if hasattr(pool, "checkedout"):
+            gauges = {
+                "booking_db_pool_size": ("Ukuran pool koneksi database", pool.size()),
+                "booking_db_pool_checked_out": ("Koneksi yang sedang dipakai", pool.checkedout()),
+                "booking_db_pool_checked_in": ("Koneksi idle di pool", pool.checkedin()),
+                "booking_db_pool_overflow": ("Koneksi overflow di atas pool_size", max(pool.overflow(), 0)),
+            }
+            for name, (doc, value) in gauges.items():
+                yield GaugeMetricFamily(name, doc, value=value)
+
+        token_stats = self.token_cache.stats()
+        yield CounterMetricFamily("booking_token_cache_hits", "Hit cache token JWT", value=token_stats["hits"])
+        yield CounterMetricFamily("booking_token_cache_misses", "Miss cache token JWT", value=token_stats["misses"])
+        yield GaugeMetricFamily("booking_token_cache_size", "Jumlah token di cache", value=token_stats["size"])
+
+        cache_stats = self.booking_cache.stats()
+        for key in ("hits", "misses", "invalidations", "stale_reads"):
+            yield CounterMetricFamily(f"booking_list_cache_{key}", f"Cache list booking: {key}", value=cache_stats[key])
+
+def register_runtime_collector(engine, token_cache, booking_cache):
+    REGISTRY.register(RuntimeCollector(engine, token_cache, booking_cache))
+
+def render_metrics() -> bytes:
+    return generate_latest(REGISTRY)
@@ -0,0 +1,68 @@
+"""initial schema: bookings dan booking_outbox
+
+Database yang sudah dibuat oleh Base.metadata.create_all sebelumnya tidak diubah,
+tabel hanya dibuat jika belum ada.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("bookings"):
+        op.create_table(
+            "bookings",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("nama_lengkap", sa.String(100)),
+            sa.Column("tanggal_lahir", sa.Date()),
+            sa.Column("jenis_kelamin", sa.Enum("LAKI_LAKI", "PEREMPUAN", name="jeniskelaminenum")),
+            sa.Column("nomor_telepon", sa.String(20)),
+            sa.Column("email", sa.String(100)),
+            sa.Column("alamat", sa.Text()),
+            sa.Column("jenis_layanan", sa.Enum("MEDICAL_CHECKUP", "VAKSINASI", "LAB_TES", name="jenislayananenum")),
+            sa.Column(
+                "tipe_layanan",
+                sa.Enum("FULL_BODY", "HPV", "ANAK_BAYI", "TES_DARAH", "TES_HORMON", "TES_URINE", name="tipelayananenum"),
+            ),
+            sa.Column("tanggal_pemeriksaan", sa.Date()),
+            sa.Column("jam_pemeriksaan", sa.Time()),
+            sa.Column("catatan", sa.Text(), nullable=True),
+            sa.Column("status", sa.Enum("PENDING", "CONFIRMED", "CANCELLED", name="statusenum")),
+            sa.Column("doctor_name", sa.String(100), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_bookings_id", "bookings", ["id"])
+
+    if not inspector.has_table("booking_outbox"):
+        op.create_table(
+            "booking_outbox",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("booking_id", sa.Integer()),
+            sa.Column("event_type", sa.String(50)),
+            sa.Column("idempotency_key", sa.String(100), unique=True),
+            sa.Column("payload", sa.JSON()),
+            sa.Column("status", sa.Enum("PENDING", "DELIVERED", "FAILED", name="outboxstatusenum")),
+            sa.Column("attempts", sa.Integer()),
+            sa.Column("next_attempt_at", sa.DateTime()),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("delivered_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_booking_outbox_booking_id", "booking_outbox", ["booking_id"])
+        op.create_index("ix_booking_outbox_status_next_attempt", "booking_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade():
+    op.drop_table("booking_outbox")
+    op.drop_table("bookings")
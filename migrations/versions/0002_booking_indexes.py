@@ -0,0 +1,24 @@
+"""index untuk list per pasien, penjadwalan dan status
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_bookings_email_id", "bookings", ["email", "id"])
+    op.create_index("ix_bookings_slot", "bookings", ["tanggal_pemeriksaan", "jam_pemeriksaan"])
+    op.create_index("ix_bookings_status_id", "bookings", ["status", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_bookings_status_id", table_name="bookings")
+    op.drop_index("ix_bookings_slot", table_name="bookings")
+    op.drop_index("ix_bookings_email_id", table_name="bookings")
@@ -0,0 +1,62 @@
+"""kapasitas slot: slot_capacities dan slot_counters
+
+Counter diisi dari booking yang belum dibatalkan. Slot yang sudah melebihi
+SLOT_DEFAULT_CAPACITY mendapat kapasitas sebesar jumlah booking yang ada.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+import os
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+jenis_layanan_enum = sa.Enum("MEDICAL_CHECKUP", "VAKSINASI", "LAB_TES", name="jenislayananenum")
+
+
+def upgrade():
+    op.create_table(
+        "slot_capacities",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("jenis_layanan", jenis_layanan_enum, nullable=False),
+        sa.Column("jam_pemeriksaan", sa.Time(), nullable=True),
+        sa.Column("capacity", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("jenis_layanan", "jam_pemeriksaan", name="uq_slot_capacities_layanan_jam"),
+    )
+    op.create_table(
+        "slot_counters",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("jenis_layanan", jenis_layanan_enum, nullable=False),
+        sa.Column("tanggal_pemeriksaan", sa.Date(), nullable=False),
+        sa.Column("jam_pemeriksaan", sa.Time(), nullable=False),
+        sa.Column("capacity", sa.Integer(), nullable=False),
+        sa.Column("reserved", sa.Integer(), nullable=False),
+        sa.UniqueConstraint("jenis_layanan", "tanggal_pemeriksaan", "jam_pemeriksaan", name="uq_slot_counters_slot"),
+    )
+
+    op.execute(
+        sa.text(
+            """
+            INSERT INTO slot_counters (jenis_layanan, tanggal_pemeriksaan, jam_pemeriksaan, capacity, reserved)
+            SELECT jenis_layanan, tanggal_pemeriksaan, jam_pemeriksaan,
+                   CASE WHEN COUNT(*) > :default_capacity THEN COUNT(*) ELSE :default_capacity END,
+                   COUNT(*)
+            FROM bookings
+            WHERE status != 'CANCELLED'
+              AND jenis_layanan IS NOT NULL
+              AND tanggal_pemeriksaan IS NOT NULL
+              AND jam_pemeriksaan IS NOT NULL
+            GROUP BY jenis_layanan, tanggal_pemeriksaan, jam_pemeriksaan
+            """
+        ).bindparams(default_capacity=int(os.getenv("SLOT_DEFAULT_CAPACITY", "10")))
+    )
+
+
+def downgrade():
+    op.drop_table("slot_counters")
+    op.drop_table("slot_capacities")
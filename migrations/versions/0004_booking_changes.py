@@ -0,0 +1,45 @@
+"""change feed booking: booking_changes
+
+Backfill satu baris per booking yang sudah ada (urut id) sehingga client yang
+sinkronisasi dari cursor 0 menerima seluruh data awal.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "booking_changes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("booking_id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(100)),
+        sa.Column("op", sa.Enum("CREATED", "UPDATED", "CANCELLED", name="changeopenum"), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_booking_changes_email_id", "booking_changes", ["email", "id"])
+
+    op.execute(
+        """
+        INSERT INTO booking_changes (booking_id, email, op, changed_at)
+        SELECT id, email,
+               CASE WHEN status = 'CANCELLED' THEN 'CANCELLED' ELSE 'CREATED' END,
+               COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+        FROM bookings
+        ORDER BY id
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_booking_changes_email_id", table_name="booking_changes")
+    op.drop_table("booking_changes")
@@ -0,0 +1,50 @@
+"""rollup analitik: booking_daily_stats
+
+Backfill dari bookings yang sudah ada, dimensi NULL disimpan sebagai ''.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "booking_daily_stats",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("tanggal_pemeriksaan", sa.Date(), nullable=False),
+        sa.Column("jenis_layanan", sa.String(20), nullable=False),
+        sa.Column("tipe_layanan", sa.String(20), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("doctor_name", sa.String(100), nullable=False),
+        sa.Column("jumlah", sa.Integer(), nullable=False),
+        sa.UniqueConstraint(
+            "tanggal_pemeriksaan", "jenis_layanan", "tipe_layanan", "status", "doctor_name",
+            name="uq_booking_daily_stats_key",
+        ),
+    )
+
+    op.execute(
+        """
+        INSERT INTO booking_daily_stats (tanggal_pemeriksaan, jenis_layanan, tipe_layanan, status, doctor_name, jumlah)
+        SELECT tanggal_pemeriksaan,
+               COALESCE(jenis_layanan, ''), COALESCE(tipe_layanan, ''),
+               COALESCE(status, ''), COALESCE(doctor_name, ''),
+               COUNT(*)
+        FROM bookings
+        WHERE tanggal_pemeriksaan IS NOT NULL
+        GROUP BY tanggal_pemeriksaan, COALESCE(jenis_layanan, ''), COALESCE(tipe_layanan, ''),
+                 COALESCE(status, ''), COALESCE(doctor_name, '')
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("booking_daily_stats")
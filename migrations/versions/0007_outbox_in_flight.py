@@ -0,0 +1,35 @@
+"""status IN_FLIGHT untuk booking_outbox
+
+Dispatcher meng-klaim event (IN_FLIGHT + lease di next_attempt_at) dan commit sebelum
+pengiriman, sehingga lock baris tidak ditahan selama request ke EMR / broker.
+Di SQLite enum disimpan sebagai VARCHAR tanpa constraint, tidak perlu diubah.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+OLD_STATUS = sa.Enum("PENDING", "DELIVERED", "FAILED", name="outboxstatusenum")
+NEW_STATUS = sa.Enum("PENDING", "IN_FLIGHT", "DELIVERED", "FAILED", name="outboxstatusenum")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "mysql":
+        op.alter_column("booking_outbox", "status", existing_type=OLD_STATUS, type_=NEW_STATUS)
+    elif dialect == "postgresql":
+        op.execute("ALTER TYPE outboxstatusenum ADD VALUE IF NOT EXISTS 'IN_FLIGHT'")
+
+
+def downgrade():
+    # Event yang sedang dikirim dikembalikan ke antrian
+    op.execute("UPDATE booking_outbox SET status = 'PENDING' WHERE status = 'IN_FLIGHT'")
+    if op.get_bind().dialect.name == "mysql":
+        op.alter_column("booking_outbox", "status", existing_type=NEW_STATUS, type_=OLD_STATUS)
@@ -0,0 +1,54 @@
+"""slot_capacities.jam_key: unique key yang juga berlaku untuk konfigurasi semua jam
+
+Unique key (jenis_layanan, jam_pemeriksaan) tidak mencegah dua baris dengan jam_pemeriksaan NULL
+di MySQL maupun SQLite. Kolom jam_key berisi '' untuk konfigurasi semua jam dan HH:MM:SS untuk
+konfigurasi per jam. Duplikat yang sudah ada dihapus, baris dengan id terbesar yang dipertahankan.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+slot_capacities = sa.table(
+    "slot_capacities",
+    sa.column("id", sa.Integer()),
+    sa.column("jenis_layanan", sa.String()),
+    sa.column("jam_pemeriksaan", sa.Time()),
+    sa.column("jam_key", sa.String()),
+)
+
+
+def upgrade():
+    op.add_column("slot_capacities", sa.Column("jam_key", sa.String(8), nullable=False, server_default=""))
+
+    conn = op.get_bind()
+    keep = {}
+    for row in conn.execute(sa.select(slot_capacities).order_by(slot_capacities.c.id)):
+        key = row.jam_pemeriksaan.strftime("%H:%M:%S") if row.jam_pemeriksaan is not None else ""
+        keep[row.jenis_layanan, key] = row.id
+    kept_ids = set(keep.values())
+    duplicates = [row.id for row in conn.execute(sa.select(slot_capacities.c.id)) if row.id not in kept_ids]
+    if duplicates:
+        conn.execute(slot_capacities.delete().where(slot_capacities.c.id.in_(duplicates)))
+    for (_, key), row_id in keep.items():
+        if key:
+            conn.execute(slot_capacities.update().where(slot_capacities.c.id == row_id).values(jam_key=key))
+
+    # batch: SQLite tidak bisa mengubah constraint tanpa membuat ulang tabel
+    with op.batch_alter_table("slot_capacities") as batch:
+        batch.drop_constraint("uq_slot_capacities_layanan_jam", type_="unique")
+        batch.create_unique_constraint("uq_slot_capacities_layanan_jam_key", ["jenis_layanan", "jam_key"])
+
+
+def downgrade():
+    with op.batch_alter_table("slot_capacities") as batch:
+        batch.drop_constraint("uq_slot_capacities_layanan_jam_key", type_="unique")
+        batch.create_unique_constraint("uq_slot_capacities_layanan_jam", ["jenis_layanan", "jam_pemeriksaan"])
+        batch.drop_column("jam_key")
@@ -1,6 +1,7 @@
 # sentracare-be-booking/models.py
 from enum import Enum
-from sqlalchemy import Column, Integer, String, Date, Time, Text, DateTime, Enum as SqlEnum
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Date, Time, Text, DateTime, JSON, LargeBinary, Index, UniqueConstraint, Enum as SqlEnum
 from sqlalchemy.sql import func
 from database import Base
 
@@ -44,4 +45,134 @@ class Booking(Base):
     status = Column(SqlEnum(StatusEnum), default=StatusEnum.PENDING)
     doctor_name = Column(String(100), nullable=True) 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # List booking per pasien: WHERE email = ? ORDER BY id DESC
+        Index("ix_bookings_email_id", "email", "id"),
+        # Penjadwalan: lookup per tanggal dan jam pemeriksaan
+        Index("ix_bookings_slot", "tanggal_pemeriksaan", "jam_pemeriksaan"),
+        # Antrian per status: WHERE status = ? ORDER BY id DESC
+        Index("ix_bookings_status_id", "status", "id"),
+    )
+
+class OutboxStatusEnum(str, Enum):
+    PENDING = "PENDING"
+    # Sedang dikirim oleh dispatcher; next_attempt_at berisi batas lease klaimnya
+    IN_FLIGHT = "IN_FLIGHT"
+    DELIVERED = "DELIVERED"
+    FAILED = "FAILED"
+
+# Outbox event booking, ditulis dalam transaksi yang sama dengan perubahan booking
+# lalu dikirim ke service lain oleh OutboxDispatcher (outbox.py)
+class BookingOutbox(Base):
+    __tablename__ = "booking_outbox"
+
+    id = Column(Integer, primary_key=True)
+    booking_id = Column(Integer, index=True)
+    event_type = Column(String(50))
+    idempotency_key = Column(String(100), unique=True)
+    payload = Column(JSON)
+    status = Column(SqlEnum(OutboxStatusEnum), default=OutboxStatusEnum.PENDING)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    delivered_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_booking_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+# Kapasitas per layanan, jam_pemeriksaan NULL berarti berlaku untuk semua jam layanan tersebut
+class SlotCapacity(Base):
+    __tablename__ = "slot_capacities"
+
+    id = Column(Integer, primary_key=True)
+    jenis_layanan = Column(SqlEnum(JenisLayananEnum), nullable=False)
+    jam_pemeriksaan = Column(Time, nullable=True)
+    # Key unik jam (slots.capacity_key): '' untuk semua jam, karena unique key MySQL / SQLite tidak
+    # menganggap dua baris dengan jam_pemeriksaan NULL sebagai duplikat
+    jam_key = Column(String(8), nullable=False, default="")
+    capacity = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("jenis_layanan", "jam_key", name="uq_slot_capacities_layanan_jam_key"),
+    )
+
+# Counter booking aktif per slot, reservasi dilakukan dengan UPDATE bersyarat reserved < capacity
+class SlotCounter(Base):
+    __tablename__ = "slot_counters"
+
+    id = Column(Integer, primary_key=True)
+    jenis_layanan = Column(SqlEnum(JenisLayananEnum), nullable=False)
+    tanggal_pemeriksaan = Column(Date, nullable=False)
+    jam_pemeriksaan = Column(Time, nullable=False)
+    capacity = Column(Integer, nullable=False)
+    reserved = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("jenis_layanan", "tanggal_pemeriksaan", "jam_pemeriksaan", name="uq_slot_counters_slot"),
+    )
+
+class ChangeOpEnum(str, Enum):
+    CREATED = "CREATED"
+    UPDATED = "UPDATED"
+    CANCELLED = "CANCELLED"
+
+# Change feed booking: satu baris per perubahan, id naik monoton menjadi cursor sinkronisasi inkremental
+class BookingChange(Base):
+    __tablename__ = "booking_changes"
+
+    id = Column(Integer, primary_key=True)
+    booking_id = Column(Integer, nullable=False)
+    email = Column(String(100))
+    op = Column(SqlEnum(ChangeOpEnum), nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Delta per pasien: WHERE email = ? AND id > ? ORDER BY id
+        Index("ix_booking_changes_email_id", "email", "id"),
+        # SQLite: id tidak dipakai ulang walau baris terakhir dihapus
+        {"sqlite_autoincrement": True},
+    )
+
+# Rollup jumlah booking per hari pemeriksaan dan dimensi dashboard, dijaga inkremental oleh write path.
+# Dimensi kosong disimpan sebagai '' (bukan NULL) agar unique key berlaku untuk semua kombinasi.
+class BookingDailyStat(Base):
+    __tablename__ = "booking_daily_stats"
+
+    id = Column(Integer, primary_key=True)
+    tanggal_pemeriksaan = Column(Date, nullable=False)
+    jenis_layanan = Column(String(20), nullable=False, default="")
+    tipe_layanan = Column(String(20), nullable=False, default="")
+    status = Column(String(20), nullable=False, default="")
+    doctor_name = Column(String(100), nullable=False, default="")
+    jumlah = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Kolom tanggal di depan: query dashboard selalu memakai rentang tanggal
+        UniqueConstraint(
+            "tanggal_pemeriksaan", "jenis_layanan", "tipe_layanan", "status", "doctor_name",
+            name="uq_booking_daily_stats_key",
+        ),
+    )
+
+# Response yang sudah dikirim per Idempotency-Key, dipakai untuk replay request yang diulang client.
+# Baris ditulis dalam transaksi yang sama dengan perubahan booking; key disimpan sebagai hash
+# dari (user, endpoint, key dari client).
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    key_hash = Column(String(64), nullable=False, unique=True)
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Purge berkala: WHERE expires_at < now
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
@@ -0,0 +1,222 @@
+# sentracare-be-booking/outbox.py
+# Transactional outbox: event booking disimpan di tabel booking_outbox bersama perubahan booking,
+# lalu dikirim di background oleh OutboxDispatcher sehingga endpoint tidak menunggu service lain.
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+import httpx
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal
+from models import Booking, BookingOutbox, OutboxStatusEnum
+from metrics import observe_emr_call
+
+PATIENT_SERVICE_URL = os.getenv("PATIENT_SERVICE_URL", "http://patient-service:8000")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+OUTBOX_HTTP_TIMEOUT = float(os.getenv("OUTBOX_HTTP_TIMEOUT", "5"))
+# Event yang sudah di-klaim (IN_FLIGHT) diambil ulang setelah lease habis, misalnya jika worker mati
+# di tengah pengiriman. Harus lebih lama dari waktu kirim terlama (push EMR + publish broker).
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))
+
+logger = logging.getLogger("booking.outbox")
+
+BOOKING_CREATED = "booking.created"
+BOOKING_CONFIRMED = "booking.confirmed"
+BOOKING_CANCELLED = "booking.cancelled"
+
+# Key per transisi (id baris booking_changes), bukan per (booking, tipe event): konfirmasi ulang setelah
+# dibatalkan atau pergantian dokter tetap menjadi event baru, retry pengiriman event yang sama memakai key yang sama
+def idempotency_key(booking_id: int, event_type: str, change_id: int) -> str:
+    return f"booking-{booking_id}-{event_type}-{change_id}"
+
+def outbox_row(booking_id: int, event_type: str, payload: dict, change_id: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "booking_id": booking_id,
+        "event_type": event_type,
+        "idempotency_key": idempotency_key(booking_id, event_type, change_id),
+        "payload": payload,
+        "status": OutboxStatusEnum.PENDING,
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    }
+
+# === Simpan event ke outbox sekaligus (executemany), commit dilakukan oleh pemanggil bersama perubahan booking ===
+# events: (booking_id, event_type, payload, id booking_changes dari transisi yang sama)
+async def enqueue_events(db: AsyncSession, events: list):
+    if events:
+        await db.execute(insert(BookingOutbox.__table__), [outbox_row(*event) for event in events])
+
+# Payload ringkas untuk event booking.created / booking.cancelled
+def booking_event_payload(booking: Booking) -> dict:
+    return {
+        "booking_id": booking.id,
+        "email": booking.email,
+        "status": booking.status.value if booking.status else None,
+        "jenis_layanan": booking.jenis_layanan.value if booking.jenis_layanan else None,
+        "tipe_layanan": booking.tipe_layanan.value if booking.tipe_layanan else None,
+        "tanggal_pemeriksaan": str(booking.tanggal_pemeriksaan) if booking.tanggal_pemeriksaan else None,
+        "jam_pemeriksaan": str(booking.jam_pemeriksaan) if booking.jam_pemeriksaan else None,
+        "doctor_name": booking.doctor_name,
+    }
+
+def backoff_delay(attempts: int) -> float:
+    delay = min(OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1)), OUTBOX_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+class OutboxDispatcher:
+    def __init__(self, session_factory=AsyncSessionLocal, client: httpx.AsyncClient = None, publisher=None):
+        self.session_factory = session_factory
+        self.client = client
+        # BookingEventPublisher (rabbitmq.py), jika diisi semua event juga dipublish ke exchange booking
+        self.publisher = publisher
+        self.handlers = {BOOKING_CONFIRMED: self.push_to_emr}
+        self._task = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    async def start(self):
+        if self.client is None:
+            # Satu client keep-alive untuk seluruh pengiriman, bukan client baru per request
+            self.client = httpx.AsyncClient(
+                base_url=PATIENT_SERVICE_URL,
+                timeout=httpx.Timeout(OUTBOX_HTTP_TIMEOUT),
+                limits=httpx.Limits(max_connections=OUTBOX_BATCH_SIZE, max_keepalive_connections=OUTBOX_BATCH_SIZE),
+            )
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    # Dipanggil setelah commit agar event baru langsung dikirim tanpa menunggu polling berikutnya
+    def notify(self):
+        self._wakeup.set()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                processed = await self.dispatch_once()
+            except Exception:
+                logger.exception("Outbox dispatcher error")
+                processed = 0
+            if processed < OUTBOX_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    # === Klaim satu batch (IN_FLIGHT + lease) lalu commit, sehingga tidak ada lock baris maupun koneksi DB
+    # yang ditahan selama pengiriman ke EMR / broker ===
+    async def claim_batch(self) -> list:
+        async with self.session_factory() as db:
+            now = datetime.utcnow()
+            stmt = (
+                select(BookingOutbox)
+                .where(
+                    BookingOutbox.status.in_([OutboxStatusEnum.PENDING, OutboxStatusEnum.IN_FLIGHT]),
+                    BookingOutbox.next_attempt_at <= now,
+                )
+                .order_by(BookingOutbox.id)
+                .limit(OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            events = (await db.execute(stmt)).scalars().all()
+            for event in events:
+                event.status = OutboxStatusEnum.IN_FLIGHT
+                event.attempts = (event.attempts or 0) + 1
+                event.next_attempt_at = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+            await db.commit()
+            return events
+
+    async def dispatch_once(self) -> int:
+        events = await self.claim_batch()
+        if not events:
+            return 0
+
+        results = await asyncio.gather(*(self.deliver(event) for event in events), return_exceptions=True)
+        async with self.session_factory() as db:
+            now = datetime.utcnow()
+            for event, error in zip(events, results):
+                if error is None:
+                    values = {"status": OutboxStatusEnum.DELIVERED, "delivered_at": now, "last_error": None}
+                else:
+                    last_error = str(error) or error.__class__.__name__
+                    fields = {
+                        "booking_id": event.booking_id,
+                        "event_type": event.event_type,
+                        "attempts": event.attempts,
+                        "error": last_error,
+                    }
+                    if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+                        values = {"status": OutboxStatusEnum.FAILED, "last_error": last_error}
+                        logger.error("Event outbox gagal permanen", extra=fields)
+                    else:
+                        values = {
+                            "status": OutboxStatusEnum.PENDING,
+                            "last_error": last_error,
+                            "next_attempt_at": now + timedelta(seconds=backoff_delay(event.attempts)),
+                        }
+                        logger.warning("Pengiriman event outbox gagal, dijadwalkan ulang", extra=fields)
+                # Hanya jika klaim ini masih berlaku: setelah lease habis event bisa sudah diklaim worker lain
+                await db.execute(
+                    update(BookingOutbox)
+                    .where(
+                        BookingOutbox.id == event.id,
+                        BookingOutbox.status == OutboxStatusEnum.IN_FLIGHT,
+                        BookingOutbox.attempts == event.attempts,
+                    )
+                    .values(**values)
+                )
+            await db.commit()
+        return len(events)
+
+    async def deliver(self, event: BookingOutbox):
+        handler = self.handlers.get(event.event_type)
+        if handler:
+            await handler(event)
+        if self.publisher:
+            # Broker yang macet tidak boleh menahan dispatcher; timeout dihitung sebagai percobaan gagal
+            await asyncio.wait_for(self.publish(event), timeout=OUTBOX_HTTP_TIMEOUT)
+
+    async def publish(self, event: BookingOutbox):
+        confirmed = await self.publisher.publish(event.event_type, event.payload, message_id=event.idempotency_key)
+        await confirmed
+
+    async def push_to_emr(self, event: BookingOutbox):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self.client.post(
+                "/patients/internal-register",
+                json=event.payload,
+                headers={"Idempotency-Key": event.idempotency_key},
+            )
+            response.raise_for_status()
+            outcome = "success"
+        except httpx.HTTPStatusError:
+            outcome = "http_error"
+            raise
+        except httpx.RequestError:
+            outcome = "network_error"
+            raise
+        finally:
+            observe_emr_call(time.perf_counter() - started, outcome)
+
+outbox_dispatcher = OutboxDispatcher()
@@ -1,22 +1,98 @@
 # sentracare-be-booking/rabbitmq.py
+# Publisher event booking ke RabbitMQ. Satu koneksi untuk seluruh umur aplikasi,
+# channel di-pool dan publish dikirim per batch dengan publisher confirms.
 import aio_pika
+from aio_pika.pool import Pool
+import asyncio
 import os
 import json
 
-# RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
-# RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
-# RABBITMQ_PASS = os.getenv("RABBITMQ_PASS", "guest")
-
-# async def publish_booking_confirmed(payload: dict):
-#     connection = await aio_pika.connect_robust(
-#         f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASS}@{RABBITMQ_HOST}/"
-#     )
-#     async with connection:
-#         channel = await connection.channel()
-#         exchange = await channel.declare_exchange("booking", aio_pika.ExchangeType.TOPIC)
-#         message = aio_pika.Message(
-#             body=json.dumps(payload).encode(),
-#             content_type="application/json"
-#         )
-#         await exchange.publish(message, routing_key="booking.confirmed")
-#         print(f"Published booking.confirmed event for booking_id={payload['booking_id']}")
\ No newline at end of file
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
+RABBITMQ_USER = os.getenv("RABBITMQ_USER", "guest")
+RABBITMQ_PASS = os.getenv("RABBITMQ_PASS", "guest")
+RABBITMQ_URL = os.getenv("RABBITMQ_URL", f"amqp://{RABBITMQ_USER}:{RABBITMQ_PASS}@{RABBITMQ_HOST}/")
+RABBITMQ_ENABLED = os.getenv("RABBITMQ_ENABLED", "false").lower() == "true"
+
+EXCHANGE_NAME = "booking"
+CHANNEL_POOL_SIZE = int(os.getenv("RABBITMQ_CHANNEL_POOL_SIZE", "4"))
+PUBLISH_QUEUE_SIZE = int(os.getenv("RABBITMQ_PUBLISH_QUEUE_SIZE", "1000"))
+PUBLISH_BATCH_SIZE = int(os.getenv("RABBITMQ_PUBLISH_BATCH_SIZE", "100"))
+
+class BookingEventPublisher:
+    def __init__(
+        self,
+        url: str = RABBITMQ_URL,
+        channel_pool_size: int = CHANNEL_POOL_SIZE,
+        queue_size: int = PUBLISH_QUEUE_SIZE,
+        batch_size: int = PUBLISH_BATCH_SIZE,
+        connect=aio_pika.connect_robust,
+    ):
+        self.url = url
+        self.channel_pool_size = channel_pool_size
+        self.batch_size = batch_size
+        self.connect = connect
+        # Queue terbatas: jika broker lambat, publish() menunggu (backpressure) alih-alih menumpuk di memori
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.connection = None
+        self.channels = None
+        self.workers = []
+
+    async def start(self):
+        self.connection = await self.connect(self.url)
+        self.channels = Pool(self._create_channel, max_size=self.channel_pool_size)
+        # Exchange cukup dideklarasikan sekali saat startup
+        async with self.channels.acquire() as channel:
+            await channel.declare_exchange(EXCHANGE_NAME, aio_pika.ExchangeType.TOPIC, durable=True)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.channel_pool_size)]
+
+    async def stop(self):
+        # Kirim sisa event di queue sebelum koneksi ditutup
+        await self.queue.join()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        await self.channels.close()
+        await self.connection.close()
+
+    async def _create_channel(self):
+        return await self.connection.channel(publisher_confirms=True)
+
+    # === Masukkan event ke queue, hasilnya future yang selesai saat broker mengonfirmasi ===
+    async def publish(self, routing_key: str, payload: dict, message_id: str = None) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        message = aio_pika.Message(
+            body=json.dumps(payload, default=str).encode(),
+            content_type="application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+            message_id=message_id,
+        )
+        await self.queue.put((routing_key, message, future))
+        return future
+
+    async def _worker(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                async with self.channels.acquire() as channel:
+                    exchange = await channel.get_exchange(EXCHANGE_NAME, ensure=False)
+                    # Publish satu batch sekaligus, confirm dari broker ditunggu bersamaan
+                    results = await asyncio.gather(
+                        *(exchange.publish(message, routing_key=routing_key) for routing_key, message, _ in batch),
+                        return_exceptions=True,
+                    )
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            for _ in batch:
+                self.queue.task_done()
+
+booking_publisher = BookingEventPublisher()
@@ -1,8 +1,15 @@
 # sentracare-be-booking/schemas.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import date, time
 from typing import Optional
 from models import JenisKelaminEnum, JenisLayananEnum, TipeLayananEnum
+from slots import is_slot_time
+
+# Jam pemeriksaan wajib tepat di grid slot (SLOT_OPEN, SLOT_CLOSE, SLOT_INTERVAL_MINUTES)
+def check_slot_time(jam: Optional[time]) -> Optional[time]:
+    if jam is not None and not is_slot_time(jam):
+        raise ValueError("Jam pemeriksaan harus sesuai jadwal slot")
+    return jam
 
 class BookingRequest(BaseModel):
     nama_lengkap: str
@@ -16,7 +23,29 @@ class BookingRequest(BaseModel):
     jam_pemeriksaan: time
     catatan: Optional[str] = None
 
+    @field_validator("jam_pemeriksaan")
+    @classmethod
+    def jam_sesuai_slot(cls, jam):
+        return check_slot_time(jam)
+
 class UpdateStatusRequest(BaseModel):
     status: str
     doctor_name: Optional[str] = None
-    doctor_email: Optional[str] = None 
\ No newline at end of file
+    doctor_email: Optional[str] = None
+
+class SlotCapacityRequest(BaseModel):
+    jenis_layanan: JenisLayananEnum
+    jam_pemeriksaan: Optional[time] = None
+    capacity: int = Field(ge=0)
+
+    @field_validator("jam_pemeriksaan")
+    @classmethod
+    def jam_sesuai_slot(cls, jam):
+        return check_slot_time(jam)
+
+# Baris untuk bulk import, email pasien opsional (default: email pengunggah)
+class BulkBookingRow(BookingRequest):
+    email: Optional[str] = None
+
+class BulkStatusRow(UpdateStatusRequest):
+    booking_id: int
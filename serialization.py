@@ -0,0 +1,45 @@
+# sentracare-be-booking/serialization.py
+# Jalur cepat serialisasi list booking: select kolom sebagai tuple lalu encode langsung dengan orjson,
+# tanpa membuat objek ORM maupun validasi ulang lewat Pydantic.
+from typing import Iterable
+import orjson
+from fastapi.responses import Response
+from models import Booking
+
+BOOKING_COLUMNS = (
+    Booking.id,
+    Booking.nama_lengkap,
+    Booking.tanggal_lahir,
+    Booking.jenis_kelamin,
+    Booking.nomor_telepon,
+    Booking.email,
+    Booking.alamat,
+    Booking.jenis_layanan,
+    Booking.tipe_layanan,
+    Booking.tanggal_pemeriksaan,
+    Booking.jam_pemeriksaan,
+    Booking.catatan,
+    Booking.status,
+    Booking.doctor_name,
+    Booking.created_at,
+    Booking.updated_at,
+)
+BOOKING_FIELDS = tuple(column.key for column in BOOKING_COLUMNS)
+
+# Enum, date, time dan datetime di-encode langsung oleh orjson (Enum -> value, tanggal -> ISO 8601)
+def rows_to_dicts(rows: Iterable) -> list:
+    return [dict(zip(BOOKING_FIELDS, row)) for row in rows]
+
+def encode_bookings(rows: Iterable) -> bytes:
+    return orjson.dumps(rows_to_dicts(rows))
+
+def encode_ndjson(rows: Iterable) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(BOOKING_FIELDS, row))) + b"\n" for row in rows)
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content)
@@ -0,0 +1,152 @@
+# sentracare-be-booking/slots.py
+# Kapasitas slot pemeriksaan: reservasi atomik lewat tabel slot_counters
+import os
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import SlotCapacity, SlotCounter, JenisLayananEnum
+from database import insert_ignore
+
+SLOT_DEFAULT_CAPACITY = int(os.getenv("SLOT_DEFAULT_CAPACITY", "10"))
+# Jam layanan, slot dibuat tiap SLOT_INTERVAL_MINUTES mulai SLOT_OPEN sampai sebelum SLOT_CLOSE
+SLOT_OPEN = time.fromisoformat(os.getenv("SLOT_OPEN", "08:00"))
+SLOT_CLOSE = time.fromisoformat(os.getenv("SLOT_CLOSE", "16:00"))
+SLOT_INTERVAL_MINUTES = int(os.getenv("SLOT_INTERVAL_MINUTES", "60"))
+MAX_SLOT_RANGE_DAYS = 31
+
+class SlotPenuhError(Exception):
+    pass
+
+def slot_times() -> List[time]:
+    current = datetime.combine(date.today(), SLOT_OPEN)
+    close = datetime.combine(date.today(), SLOT_CLOSE)
+    times = []
+    while current < close:
+        times.append(current.time())
+        current += timedelta(minutes=SLOT_INTERVAL_MINUTES)
+    return times
+
+# Jam di luar grid slot (misal 08:00:01) akan mendapat counter sendiri dan melewati kapasitas slot aslinya
+def is_slot_time(jam: time) -> bool:
+    return jam in slot_times()
+
+# Nilai kolom slot_capacities.jam_key: '' untuk konfigurasi semua jam layanan
+def capacity_key(jam: Optional[time]) -> str:
+    return jam.strftime("%H:%M:%S") if jam is not None else ""
+
+# === Kapasitas untuk jenis layanan: konfigurasi per jam > konfigurasi layanan > default ===
+async def capacity_config(db: AsyncSession, jenis_layanan: JenisLayananEnum) -> dict:
+    rows = (await db.execute(
+        select(SlotCapacity.jam_pemeriksaan, SlotCapacity.capacity).where(SlotCapacity.jenis_layanan == jenis_layanan)
+    )).all()
+    return {jam: capacity for jam, capacity in rows}
+
+def capacity_for(config: dict, jam: time) -> int:
+    if jam in config:
+        return config[jam]
+    return config.get(None, SLOT_DEFAULT_CAPACITY)
+
+def slot_filter(jenis_layanan, tanggal, jam):
+    return (
+        SlotCounter.jenis_layanan == jenis_layanan,
+        SlotCounter.tanggal_pemeriksaan == tanggal,
+        SlotCounter.jam_pemeriksaan == jam,
+    )
+
+async def _increment(db: AsyncSession, jenis_layanan, tanggal, jam, count: int) -> bool:
+    # Satu UPDATE bersyarat: aman walau banyak worker menulis slot yang sama bersamaan
+    result = await db.execute(
+        update(SlotCounter)
+        .where(*slot_filter(jenis_layanan, tanggal, jam), SlotCounter.reserved + count <= SlotCounter.capacity)
+        .values(reserved=SlotCounter.reserved + count)
+    )
+    return result.rowcount > 0
+
+# === Reservasi slot, dijalankan dalam transaksi yang sama dengan insert booking ===
+async def reserve_slot(db: AsyncSession, jenis_layanan: JenisLayananEnum, tanggal: date, jam: time, count: int = 1) -> bool:
+    if await _increment(db, jenis_layanan, tanggal, jam, count):
+        return True
+    # Counter slot belum ada (booking pertama) atau slot sudah penuh
+    capacity = capacity_for(await capacity_config(db, jenis_layanan), jam)
+    await db.execute(
+        insert_ignore(SlotCounter, db.bind.dialect.name).values(
+            jenis_layanan=jenis_layanan,
+            tanggal_pemeriksaan=tanggal,
+            jam_pemeriksaan=jam,
+            capacity=capacity,
+            reserved=0,
+        )
+    )
+    return await _increment(db, jenis_layanan, tanggal, jam, count)
+
+async def release_slot(db: AsyncSession, jenis_layanan: JenisLayananEnum, tanggal: date, jam: time, count: int = 1):
+    await db.execute(
+        update(SlotCounter)
+        .where(*slot_filter(jenis_layanan, tanggal, jam), SlotCounter.reserved >= count)
+        .values(reserved=SlotCounter.reserved - count)
+    )
+
+# === Slot tersedia untuk rentang tanggal, counter diambil dalam satu query ===
+async def available_slots(db: AsyncSession, jenis_layanan: JenisLayananEnum, tanggal_dari: date, tanggal_sampai: date) -> list:
+    counters = (await db.execute(
+        select(SlotCounter.tanggal_pemeriksaan, SlotCounter.jam_pemeriksaan, SlotCounter.capacity, SlotCounter.reserved)
+        .where(
+            SlotCounter.jenis_layanan == jenis_layanan,
+            SlotCounter.tanggal_pemeriksaan >= tanggal_dari,
+            SlotCounter.tanggal_pemeriksaan <= tanggal_sampai,
+        )
+    )).all()
+    used = {(row.tanggal_pemeriksaan, row.jam_pemeriksaan): row for row in counters}
+    config = await capacity_config(db, jenis_layanan)
+
+    result = []
+    times = sorted(set(slot_times()) | {jam for _, jam in used})
+    tanggal = tanggal_dari
+    while tanggal <= tanggal_sampai:
+        for jam in times:
+            counter = used.get((tanggal, jam))
+            capacity = counter.capacity if counter else capacity_for(config, jam)
+            reserved = counter.reserved if counter else 0
+            result.append({
+                "tanggal_pemeriksaan": tanggal,
+                "jam_pemeriksaan": str(jam),
+                "capacity": capacity,
+                "reserved": reserved,
+                "tersedia": max(capacity - reserved, 0),
+            })
+        tanggal += timedelta(days=1)
+    return result
+
+# === Simpan konfigurasi kapasitas dan terapkan ke counter slot yang akan datang ===
+async def set_capacity(db: AsyncSession, jenis_layanan: JenisLayananEnum, jam: time, capacity: int):
+    # UPDATE lalu INSERT IGNORE pada unique key (jenis_layanan, jam_key), bukan cek lalu tambah:
+    # request bersamaan tidak bisa membuat dua baris konfigurasi, yang kalah cukup mengulang UPDATE
+    key = capacity_key(jam)
+    existing = (
+        update(SlotCapacity)
+        .where(SlotCapacity.jenis_layanan == jenis_layanan, SlotCapacity.jam_key == key)
+        .values(capacity=capacity)
+    )
+    if not (await db.execute(existing)).rowcount:
+        inserted = await db.execute(
+            insert_ignore(SlotCapacity, db.bind.dialect.name).values(
+                jenis_layanan=jenis_layanan, jam_pemeriksaan=jam, jam_key=key, capacity=capacity
+            )
+        )
+        if not inserted.rowcount:
+            await db.execute(existing)
+
+    stmt = update(SlotCounter).where(
+        SlotCounter.jenis_layanan == jenis_layanan,
+        SlotCounter.tanggal_pemeriksaan >= date.today(),
+    )
+    if jam is not None:
+        stmt = stmt.where(SlotCounter.jam_pemeriksaan == jam)
+    else:
+        # Konfigurasi per jam yang lebih spesifik tidak ditimpa
+        specific = select(SlotCapacity.jam_pemeriksaan).where(
+            SlotCapacity.jenis_layanan == jenis_layanan, SlotCapacity.jam_pemeriksaan.is_not(None)
+        )
+        stmt = stmt.where(SlotCounter.jam_pemeriksaan.not_in(specific))
+    await db.execute(stmt.values(capacity=capacity))